@@ -0,0 +1,145 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from llm import LLM
+from constants import MAX_WORKERS
+
+
+def job_id(spec):
+    if spec.get("id"):
+        return str(spec["id"])
+    key = [spec.get(field) for field in ("query", "industry", "region", "size")]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:12]
+
+
+def required(name, fn, *args):
+    """Return fn(*args), raising when it is empty so the failure is retried instead of shared."""
+    result = fn(*args)
+    if not result:
+        raise ValueError(f"No {name} returned")
+    return result
+
+
+def load_jobs(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class BatchRunner:
+    """Run many (query, industry, region, size) jobs on one worker pool.
+
+    Work shared between jobs is computed once per batch: discovery per (industry, region,
+    size), data items and their source plan per query, search results per company and
+    extraction per (query, company). Raw search results are only kept while extractions
+    using them run, and failures are not shared with later jobs. Every finished (job, company) result is appended to
+    the checkpoint JSON Lines file, and an interrupted batch started again with the same
+    checkpoint skips those companies.
+    """
+
+    def __init__(self, llm=None, workers=MAX_WORKERS, checkpoint="batch_results.jsonl"):
+        self.llm = llm or LLM()
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.shared_results = {}
+        self.borrowers = {}
+        self.shared_lock = threading.Lock()
+        self.checkpoint_lock = threading.Lock()
+
+    def shared(self, key, fn, *args):
+        """Return fn(*args), computing it only once per key across all jobs and workers."""
+        with self.shared_lock:
+            future = self.shared_results.get(key)
+            owner = future is None
+            if owner:
+                future = self.shared_results[key] = Future()
+
+        if owner:
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                # Callers already waiting get the error, later ones compute it again
+                with self.shared_lock:
+                    if self.shared_results.get(key) is future:
+                        del self.shared_results[key]
+                future.set_exception(e)
+
+        return future.result()
+
+    @contextmanager
+    def borrowed(self, key, fn, *args):
+        """Like shared(), but the result is dropped once every caller using it has exited."""
+        with self.shared_lock:
+            self.borrowers[key] = self.borrowers.get(key, 0) + 1
+
+        try:
+            yield self.shared(key, fn, *args)
+        finally:
+            with self.shared_lock:
+                self.borrowers[key] -= 1
+                if not self.borrowers[key]:
+                    del self.borrowers[key]
+                    self.shared_results.pop(key, None)
+
+    def completed(self):
+        if not os.path.exists(self.checkpoint):
+            return set()
+
+        with open(self.checkpoint) as file:
+            return {(record["job"], record["company"]) for record in map(json.loads, filter(str.strip, file))}
+
+    def run(self, jobs):
+        completed = self.completed()
+        print(f"Resuming with {len(completed)} completed companies" if completed else f"Starting {len(jobs)} jobs")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self.discover, job): (job, None) for job in jobs}
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, company = pending.pop(future)
+
+                    if future.exception():
+                        print(f"Job {job_id(job)} failed{' for ' + company['name'] if company else ''}: {repr(future.exception())}")
+                        continue
+
+                    if company is None:
+                        for company in future.result():
+                            if (job_id(job), company["name"]) not in completed:
+                                pending[executor.submit(self.process, job, company)] = (job, company)
+                    else:
+                        self.save(job, company, future.result())
+
+    def discover(self, job):
+        return self.shared(("companies", job["industry"], job["region"], job["size"]), self.llm.search_companies, job["industry"], job["region"], job["size"])
+
+    def process(self, job, company):
+        query = job["query"]
+        data_items = self.shared(("data_items", query), required, "data items", self.llm.search_user_data_items, query)
+        source_plan = self.shared(("source_plan", query), required, "source plan", self.llm.plan_data_sources, data_items)
+        company_key = company.get("linkedin_url") or company["name"]
+
+        def extract():
+            with self.borrowed(("search_results", company_key), self.llm.launch_search_apis, [company]) as search_results:
+                return self.llm.extract_info(data_items, [company], search_results, source_plan=source_plan)[0]
+
+        return self.shared(("extraction", query, company_key), extract)
+
+    def save(self, job, company, result):
+        record = {"job": job_id(job), "company": company["name"], "result": result}
+        with self.checkpoint_lock, open(self.checkpoint, "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a batch of company search jobs from a JSON Lines file of job specs.")
+    parser.add_argument("jobs", help="JSON Lines file with one {id, query, industry, region, size} job per line")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--checkpoint", default="batch_results.jsonl", help="JSON Lines file results are appended to and resumed from")
+    args = parser.parse_args()
+
+    BatchRunner(workers=args.workers, checkpoint=args.checkpoint).run(load_jobs(args.jobs))
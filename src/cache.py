@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from constants import CACHE_PATH, CACHE_MAX_MEMORY_ENTRIES, CACHE_MAX_DISK_ENTRIES, CACHE_MAINTENANCE_EVERY
+
+
+class ResponseCache:
+    """Two-tier (in-memory LRU + SQLite) cache of string values with per-entry TTLs.
+
+    Disk hits only record their access time in memory; the access times are written and
+    expired or least recently used disk entries evicted once every maintenance_every
+    writes or disk hits, so no read commits and most writes skip the eviction scans.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_memory_entries=CACHE_MAX_MEMORY_ENTRIES, max_disk_entries=CACHE_MAX_DISK_ENTRIES, maintenance_every=CACHE_MAINTENANCE_EVERY):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.maintenance_every = maintenance_every
+        self.accessed = {}
+        self.writes = 0
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.db = None
+
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+            self.db.commit()
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+
+        with self.lock:
+            if key in self.memory:
+                value, expires_at = self.memory[key]
+                if expires_at > now:
+                    self.memory.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return value
+                del self.memory[key]
+
+            if self.db:
+                row = self.db.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and row[1] > now:
+                    self.accessed[key] = now
+                    if len(self.accessed) >= self.maintenance_every:
+                        self._write_accessed()
+                        self.db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits["disk"] += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        expires_at = now + ttl
+
+        with self.lock:
+            self._remember(key, value, expires_at)
+
+            if self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, expires_at, now)
+                )
+                self.accessed.pop(key, None)
+                self.writes += 1
+                if self.writes % self.maintenance_every == 0:
+                    self._write_accessed()
+                    self._evict_disk(now)
+                self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            return {"hits": dict(self.hits), "misses": self.misses, "memory_entries": len(self.memory)}
+
+    def _remember(self, key, value, expires_at):
+        self.memory[key] = (value, expires_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    def _write_accessed(self):
+        self.db.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?", [(at, key) for key, at in self.accessed.items()])
+        self.accessed = {}
+
+    def _evict_disk(self, now):
+        self.db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        (count,) = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        if count > self.max_disk_entries:
+            self.db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+INDEX_FILE = "index.json"
+COLUMNS_DIR = "columns"
+BLOBS_DIR = "blobs"
+
+
+class ColumnarWriter:
+    """Append-only columnar store of extracted results, written one row at a time.
+
+    Each column is a JSONL file holding one value per row, so memory stays flat however many
+    rows are written and readers can load only the columns they need. index.json lists the
+    columns and the number of complete rows; it is rewritten atomically on every flush, so an
+    interrupted scan leaves a readable store. Raw source payloads are written to gzip blobs
+    named by the hash of their content and referenced from the "sources" column by ID.
+    """
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.files = {}
+        self.pending_sources = {}
+        os.makedirs(os.path.join(path, COLUMNS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(path, BLOBS_DIR), exist_ok=True)
+
+        index = read_index(path)
+        self.rows = index["rows"]
+        self.columns = index["columns"]
+        for name, file_name in self.columns.items():
+            self.files[name] = self.open_column(file_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open_column(self, file_name):
+        column_path = os.path.join(self.path, COLUMNS_DIR, file_name)
+        # Drop values past the last indexed row, left over from an interrupted write
+        if os.path.exists(column_path):
+            with open(column_path) as file:
+                lines = [line for _, line in zip(range(self.rows), file)]
+            with open(column_path, "w") as file:
+                file.writelines(lines)
+        return open(column_path, "a")
+
+    def add_column(self, name):
+        file_name = f"{len(self.columns):04d}-{re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')}.jsonl"
+        self.columns[name] = file_name
+        # The file may be left over from an interrupted write that never reached the index
+        self.files[name] = open(os.path.join(self.path, COLUMNS_DIR, file_name), "w")
+        self.files[name].write("null\n" * self.rows)
+
+    def put_blob(self, payload):
+        """Store a payload as a compressed blob and return its ID."""
+        data = json.dumps(payload, sort_keys=True).encode()
+        blob_id = hashlib.sha256(data).hexdigest()[:32]
+        blob_path = os.path.join(self.path, BLOBS_DIR, f"{blob_id}.json.gz")
+        if not os.path.exists(blob_path):
+            with open(f"{blob_path}.{threading.get_ident()}.tmp", "wb") as file:
+                file.write(gzip.compress(data))
+            os.replace(f"{blob_path}.{threading.get_ident()}.tmp", blob_path)
+        return blob_id
+
+    def add_sources(self, company, search_results):
+        """Store a company's raw search results ahead of its row; write() references them."""
+        blob_ids = {source: self.put_blob(payload) for source, payload in search_results.items() if payload}
+        with self.lock:
+            self.pending_sources[company["name"]] = blob_ids
+
+    def write(self, result, search_results=None):
+        """Append one result row; search_results are stored as blobs and referenced from the "sources" column."""
+        if search_results is not None:
+            self.add_sources({"name": result["company"]}, search_results)
+
+        with self.lock:
+            row = dict(result)
+            row["sources"] = self.pending_sources.pop(result["company"], None)
+            for name in row:
+                if name not in self.files:
+                    self.add_column(name)
+            for name, file in self.files.items():
+                file.write(json.dumps(row.get(name)) + "\n")
+            self.rows += 1
+
+            if self.rows % self.flush_every == 0:
+                self.flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self.flush_locked()
+
+    def flush_locked(self):
+        for file in self.files.values():
+            file.flush()
+        index_path = os.path.join(self.path, INDEX_FILE)
+        with open(f"{index_path}.tmp", "w") as file:
+            json.dump({"rows": self.rows, "columns": self.columns}, file, indent=4)
+        os.replace(f"{index_path}.tmp", index_path)
+
+    def close(self):
+        with self.lock:
+            self.flush_locked()
+            for file in self.files.values():
+                file.close()
+            self.files = {}
+
+
+class ColumnarReader:
+    """Lazy reader of a ColumnarWriter store: columns are read from disk only when iterated."""
+
+    def __init__(self, path):
+        self.path = path
+        index = read_index(path)
+        self.rows = index["rows"]
+        self.columns = index["columns"]
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        """Yield the values of one column, row by row."""
+        with open(os.path.join(self.path, COLUMNS_DIR, self.columns[name])) as file:
+            for _, line in zip(range(self.rows), file):
+                yield json.loads(line)
+
+    def iter_rows(self, columns=None):
+        """Yield each row as a dict holding only the selected columns (all by default)."""
+        columns = list(columns or self.columns)
+        for values in zip(*[self.column(name) for name in columns]):
+            yield dict(zip(columns, values))
+
+    def load_columns(self, columns):
+        """Return {column: [values]} for the selected columns."""
+        return {name: list(self.column(name)) for name in columns}
+
+    def blob(self, blob_id):
+        with gzip.open(os.path.join(self.path, BLOBS_DIR, f"{blob_id}.json.gz")) as file:
+            return json.load(file)
+
+    def sources(self, row):
+        """Load the raw search results a row references."""
+        return {source: self.blob(blob_id) for source, blob_id in (row.get("sources") or {}).items()}
+
+
+def read_index(path):
+    try:
+        with open(os.path.join(path, INDEX_FILE)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"rows": 0, "columns": {}}
@@ -0,0 +1,42 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from constants import MAX_WORKERS
+
+provider_semaphores = {}
+provider_semaphores_lock = threading.Lock()
+
+
+def provider_semaphore(provider, limit):
+    """Return the semaphore shared by every task of this provider run with this limit, process-wide."""
+    with provider_semaphores_lock:
+        if (provider, limit) not in provider_semaphores:
+            provider_semaphores[(provider, limit)] = threading.BoundedSemaphore(limit)
+        return provider_semaphores[(provider, limit)]
+
+
+def run_concurrently(tasks, max_workers=MAX_WORKERS, provider_limits=None):
+    """Run (key, provider, fn, args) tasks on a thread pool.
+
+    Yields (key, result, error) tuples as soon as each task finishes. At most
+    max_workers tasks run at once overall, and at most provider_limits[provider]
+    tasks run at once for a given provider.
+    """
+    tasks = list(tasks)
+    provider_limits = provider_limits or {}
+    semaphores = {}
+
+    for _, provider, _, _ in tasks:
+        if provider not in semaphores:
+            semaphores[provider] = provider_semaphore(provider, provider_limits.get(provider, max_workers))
+
+    def limited(provider, fn, args):
+        with semaphores[provider]:
+            return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(limited, provider, fn, args): key for key, provider, fn, args in tasks}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
@@ -1,10 +1,13 @@
+import os
 from enum import Enum, auto
 
 class Actions(Enum): 
     SEARCH_COMPANIES = auto(), 
     SEARCH_USER_DATA_ITEMS = auto(), 
     LAUNCH_SEARCH_APIS = auto(), 
-    EXTRACT_INFO = auto()
+    PLAN_DATA_SOURCES = auto(), 
+    EXTRACT_INFO = auto(), 
+    STREAM_PIPELINE = auto()
 
 class PromptText(Enum):
     SEARCH_COMPANIES = """
@@ -62,6 +65,18 @@ class PromptText(Enum):
          Key information: name, position
     """
 
+    DATA_ITEMS_SPECIFICATION = """
+        A user wants to know some information about the following data items regarding a company's profile: {data_items}.
+        For each data item provide:
+        - description: a brief directive in a single sentence on what information should be collected
+        - format: what this piece of information normally is, exactly one of {formats}
+        - key_information: a list of two to three key informations required to understand this data item
+        For example, for Headquarters the key information is city, country, address,
+        and for Funding the key information is value, currency, date.
+        Answer in json format with the following format, keeping the data item names exactly as given:
+        {{data_items: [{{name, description, format, key_information}}]}}
+    """
+
     DATA_SOURCE_PROMPT = """Here is the search term you should act on: {data_item_name},
         You are expected to find the right data sources from this list:
         {sources}
@@ -74,11 +89,32 @@ class PromptText(Enum):
         If no information was found in the given information please answer with 'None' and nothing more.
         If you found the information ONLY return the information as is, nothing more."""
 
+    FIND_USER_DATA_ITEMS_BATCH_PROMPT = """I am giving you data about a company: {data}.
+        I want you to find the following pieces of information, each given with a description, its expected format and its key information:
+        {data_items}
+        Answer in json format with one key per piece of information, using exactly the names given above: {{name: value}}.
+        If no information was found for a piece of information set its value to 'None'.
+        If you found the information ONLY return the information as is, nothing more."""
+
     SEARCH_LLM_EXTRACTION_PROMPT = """Can you provide me the {data_item} of this company: {company_name}?
         The answer should be short and concise, it should only answer with the requested data:
         Don't form phrases, only give the number or a single word to answer the question
         If no data was found answer with None"""
 
+    SEARCH_LLM_BATCH_EXTRACTION_PROMPT = """Can you provide me the following data items of this company: {company_name}?
+        Data items: {data_items}
+        Each answer should be short and concise, it should only answer with the requested data:
+        Don't form phrases, only give the number or a single word to answer the question
+        Answer in json format with one key per data item, using exactly the names given above: {{data_item: answer}}.
+        If no data was found for a data item set its value to None"""
+
+    SEARCH_LLM_MULTI_COMPANY_EXTRACTION_PROMPT = """Can you provide me the {data_item} of each of these companies?
+        Companies: {company_names}
+        Each answer should be short and concise, it should only answer with the requested data:
+        Don't form phrases, only give the number or a single word to answer the question
+        Answer in json format with one key per company, using exactly the names given above: {{company: answer}}.
+        If no data was found for a company set its value to None"""
+
     SYSTEM_ANALYST = "You are a professional analyst"
 
     SYSTEM_HELPFUL_BOT = "You are a helpful bot tasked with extracting information from a given text. If the requested information isn't available return 'None'"
@@ -94,3 +130,215 @@ SOURCES = {
     "linkedin_search_results": "Contains information of a company in LinkedIn. So we can extract a description and very basic general information like the name and location.",
     "crunchbase_search_results": "Contains information of a company in Crunchbase, it's mainly useful for searching financial information on a company like investment rounds",
 }
+
+DATA_ITEM_FORMATS = [
+    "link",
+    "financial figure/monetary value",
+    "numerical amount",
+    "binary answer",
+    "date information",
+    "geographical location",
+    "piece of text",
+]
+
+# Maps the SOURCES keys the model answers with to the keys used in launch_search_apis results
+SOURCE_RESULT_KEYS = {
+    "linkedin_search_results": "linkedin",
+    "crunchbase_search_results": "crunchbase",
+}
+
+# Keywords used by the deterministic data source router, matched against a data item's name, description and key information
+SOURCE_KEYWORDS = {
+    "linkedin_search_results": [
+        "description", "about", "overview", "location", "headquarter", "address", "city", "country", "employee", "staff",
+        "size", "industry", "sector", "specialt", "website", "link", "social", "founded", "name", "contact", "tagline",
+    ],
+    "crunchbase_search_results": [
+        "funding", "fund", "investor", "investment", "round", "raised", "revenue", "valuation", "financial", "acquisition",
+        "acquired", "ipo", "stock", "money", "monetary", "founded", "founder", "stage", "series",
+    ],
+}
+
+# Most data items (grouped by company) or companies (grouped by data item) asked in one search fallback prompt
+FALLBACK_BATCH_SIZE = 5
+
+# Number of discovered companies scraped and enriched per search
+MAX_COMPANIES = 10
+
+# CONCURRENCY
+
+MAX_WORKERS = 8
+
+PROVIDER_CONCURRENCY = {
+    "openai": 8,
+    "apify": 5,
+    "linkedin": 4,
+    "crunchbase": 4,
+}
+
+# CACHE
+
+CACHE_PATH = os.getenv("HORYZON_CACHE_PATH", ".cache/llm_responses.sqlite")
+
+CACHE_MAX_MEMORY_ENTRIES = 1024
+
+CACHE_MAX_DISK_ENTRIES = 100_000
+
+# Disk eviction and access-time updates run once per this many writes or disk hits
+CACHE_MAINTENANCE_EVERY = 100
+
+DAY = 24 * 60 * 60
+
+# Time-to-live in seconds per prompt type; prompt types not listed are never cached
+CACHE_TTLS = {
+    PromptText.SEARCH_COMPANIES: DAY,
+    PromptText.USER_DATA_ITEMS: 30 * DAY,
+    PromptText.DATA_ITEM_DESCRIPTION: 30 * DAY,
+    PromptText.DATA_ITEM_FORMAT: 30 * DAY,
+    PromptText.DATA_ITEM_INFO_LIST: 30 * DAY,
+    PromptText.DATA_ITEMS_SPECIFICATION: 30 * DAY,
+    PromptText.DATA_SOURCE_PROMPT: 30 * DAY,
+    PromptText.FIND_USER_DATA_ITEMS_PROMPT: 7 * DAY,
+    PromptText.FIND_USER_DATA_ITEMS_BATCH_PROMPT: 7 * DAY,
+    PromptText.SEARCH_LLM_EXTRACTION_PROMPT: 7 * DAY,
+    PromptText.SEARCH_LLM_BATCH_EXTRACTION_PROMPT: 7 * DAY,
+    PromptText.SEARCH_LLM_MULTI_COMPANY_EXTRACTION_PROMPT: 7 * DAY,
+}
+
+# PRUNING
+
+# Approximate token budget for the source document sent in a single extraction prompt
+SOURCE_TOKEN_BUDGET = 1500
+
+# Fields kept in every pruned source document, matched against the last segment of their field path
+ALWAYS_KEPT_FIELDS = {"name", "source", "permalink", "website", "url"}
+
+# HTTP
+
+PERPLEXITY_BASE_URL = os.getenv("PERPLEXITY_BASE_URL", "https://api.perplexity.ai")
+
+APIFY_API_URL = os.getenv("APIFY_API_URL", "https://api.apify.com")
+
+LINKEDIN_API_URL = os.getenv("LINKEDIN_API_URL", "https://api.linkedin.com/v2")
+
+CRUNCHBASE_API_URL = os.getenv("CRUNCHBASE_API_URL", "https://api.crunchbase.com/api/v4")
+
+# (connect, read) timeouts in seconds
+HTTP_TIMEOUT = (5, 30)
+
+HTTP_MAX_RETRIES = 3
+
+# Base and maximum delay in seconds of the exponential backoff between retries
+HTTP_BACKOFF = 0.5
+
+HTTP_MAX_BACKOFF = 30
+
+HTTP_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Token bucket per provider: (requests per second, burst size)
+PROVIDER_RATE_LIMITS = {
+    "linkedin": (5, 10),
+    "crunchbase": (3, 5),
+}
+
+# CRUNCHBASE
+
+CRUNCHBASE_INDEX_PATH = os.getenv("CRUNCHBASE_INDEX_PATH", ".cache/crunchbase_permalinks.sqlite")
+
+# Fields requested for an organization, including linkedin so the same response serves matching and extraction
+CRUNCHBASE_FIELD_IDS = ",".join([
+    "identifier", "short_description", "description", "website_url", "linkedin", "location_identifiers",
+    "founded_on", "num_employees_enum", "categories", "operating_status", "ipo_status", "revenue_range",
+    "funding_total", "num_funding_rounds", "last_funding_type", "last_funding_at", "investor_identifiers",
+])
+
+# ENTITY STORE
+
+ENTITY_STORE_PATH = os.getenv("ENTITY_STORE_PATH", ".cache/entities.sqlite")
+
+# Age in seconds after which a stored entry is stale and fetched again
+ENTITY_MAX_AGE = {
+    "discovery": 30 * DAY,
+    "linkedin": 7 * DAY,
+    "crunchbase": 7 * DAY,
+}
+
+# INSTRUMENTATION
+
+# Upper bounds in milliseconds of the latency histogram buckets
+LATENCY_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+# Spans kept individually for the Chrome trace; later spans only feed the aggregated report
+MAX_TRACE_EVENTS = 100_000
+
+# MODEL TIERS
+
+# Tiers from cheapest to strongest; a prompt escalates to the next tier when its answer is unusable
+TIER_ORDER = ["fast", "strong"]
+
+MODEL_TIERS = {
+    "openai": {"fast": "gpt-3.5-turbo-0125", "strong": "gpt-4o"},
+    "perplexity": {"fast": "sonar-medium-online", "strong": "sonar-large-online"},
+}
+
+# Starting tier per prompt type; prompt types not listed start on the first tier
+PROMPT_TIERS = {
+    PromptText.SEARCH_COMPANIES: "fast",
+    PromptText.USER_DATA_ITEMS: "fast",
+    PromptText.DATA_ITEMS_SPECIFICATION: "fast",
+    PromptText.DATA_ITEM_DESCRIPTION: "fast",
+    PromptText.DATA_ITEM_FORMAT: "fast",
+    PromptText.DATA_ITEM_INFO_LIST: "fast",
+    PromptText.DATA_SOURCE_PROMPT: "fast",
+    PromptText.FIND_USER_DATA_ITEMS_PROMPT: "fast",
+    PromptText.FIND_USER_DATA_ITEMS_BATCH_PROMPT: "fast",
+    PromptText.SEARCH_LLM_EXTRACTION_PROMPT: "fast",
+    PromptText.SEARCH_LLM_BATCH_EXTRACTION_PROMPT: "fast",
+    PromptText.SEARCH_LLM_MULTI_COMPANY_EXTRACTION_PROMPT: "fast",
+}
+
+# Prompt types retried on the next tier when the answer is empty, invalid JSON or 'None'
+ESCALATING_PROMPTS = {
+    PromptText.SEARCH_COMPANIES,
+    PromptText.DATA_ITEMS_SPECIFICATION,
+    PromptText.DATA_SOURCE_PROMPT,
+    PromptText.FIND_USER_DATA_ITEMS_BATCH_PROMPT,
+    PromptText.SEARCH_LLM_EXTRACTION_PROMPT,
+    PromptText.SEARCH_LLM_BATCH_EXTRACTION_PROMPT,
+    PromptText.SEARCH_LLM_MULTI_COMPANY_EXTRACTION_PROMPT,
+}
+
+# RESULT STORE
+
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", ".cache/results.sqlite")
+
+# Bump when extraction changes in a way the prompt templates and models do not capture, to invalidate stored cells
+EXTRACTION_VERSION = 1
+
+# COMPANY NAMES
+
+# Trailing tokens dropped when normalizing company names
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "llc", "llp", "lp", "ltd", "limited",
+    "plc", "gmbh", "ag", "sa", "sas", "sarl", "srl", "spa", "bv", "nv", "oy", "ab", "as", "pty", "uk"
+}
+
+# Minimum similarity of two normalized names for them to be considered the same company
+NAME_MATCH_THRESHOLD = 0.9
+
+# SCRAPER
+
+# Apify actor running the Google searches for LinkedIn company pages
+APIFY_ACTOR_ID = "nFJndFXA5zjCTuudP"
+
+# Time-to-live in seconds of a cached actor result, keyed by the exact actor input
+SCRAPER_CACHE_TTL = 7 * DAY
+
+# SPECULATIVE FALLBACK
+
+# Data items with fewer relevant fields than this across a company's routed sources race the direct search prompt
+SPECULATION_MIN_FIELDS = 1
+
+# Cost caps: at most this many speculative (company, data item) pairs per extraction, and at most this share of its pairs
+SPECULATION_MAX_PAIRS = 50
+SPECULATION_MAX_SHARE = 0.25
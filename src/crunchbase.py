@@ -1,51 +1,137 @@
-import requests
 import urllib.parse as urlparse
 import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from constants import CRUNCHBASE_API_URL, CRUNCHBASE_INDEX_PATH, CRUNCHBASE_FIELD_IDS, PROVIDER_CONCURRENCY
+from http_client import get_client
+from linkedin import clean_linkedin_url
 
-def get_crunchbase_company_url_from_linkedin(linkedin_company_data):
-    try:
-        return linkedin_company_data.get("crunchbaseFundingData", {}).get("organizationUrl", "")
-    except Exception as e:
-        print(repr(e))
-        print("Crunchbase data not found in LinkedIn company dictionary")
+
+class PermalinkIndex:
+    """Persistent mapping between Crunchbase permalinks and the LinkedIn URL they list."""
+
+    def __init__(self, path=CRUNCHBASE_INDEX_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS permalinks ("
+            "permalink TEXT PRIMARY KEY, linkedin_url TEXT NOT NULL, resolved_at REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS permalinks_linkedin_url ON permalinks (linkedin_url)")
+        self.db.commit()
+
+    def linkedin_url(self, permalink):
+        with self.lock:
+            row = self.db.execute("SELECT linkedin_url FROM permalinks WHERE permalink = ?", (permalink,)).fetchone()
+        return row[0] if row else None
+
+    def permalink(self, linkedin_url):
+        with self.lock:
+            row = self.db.execute("SELECT permalink FROM permalinks WHERE linkedin_url = ?", (normalize_linkedin_url(linkedin_url),)).fetchone()
+        return row[0] if row else None
+
+    def add(self, permalink, linkedin_url):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO permalinks (permalink, linkedin_url, resolved_at) VALUES (?, ?, ?)",
+                (permalink, normalize_linkedin_url(linkedin_url), time.time())
+            )
+            self.db.commit()
+
+
+permalink_index = None
+permalink_index_lock = threading.Lock()
+
+# Candidate entity fetches of every resolution share this pool, sized like the Crunchbase connection pool
+candidate_fetcher = ThreadPoolExecutor(max_workers=PROVIDER_CONCURRENCY["crunchbase"])
+
+
+def get_permalink_index():
+    global permalink_index
+    with permalink_index_lock:
+        if permalink_index is None:
+            permalink_index = PermalinkIndex()
+        return permalink_index
+
+
+def normalize_linkedin_url(url):
+    if not url:
         return ""
+    url = clean_linkedin_url(url.strip()).rstrip("/").lower()
+    return url.replace("http://", "https://").replace("://linkedin.com", "://www.linkedin.com")
+
 
 def search_crunchbase_autocomplete(company_name, crunchbase_api_key):
-    crunchbase_url = "https://api.crunchbase.com/api/v4/autocompletes"
+    crunchbase_url = f"{CRUNCHBASE_API_URL}/autocompletes"
     params = {
         'user_key': crunchbase_api_key,
         'query': urlparse.quote_plus(company_name),
         'collection_ids': 'organization.companies'
     }
-    response = requests.get(crunchbase_url, params=params)
+    response = get_client("crunchbase").get(crunchbase_url, params=params)
     if response.status_code == 200:
         return response.json().get("entities", [])
     else:
         print(f"Failed to search Crunchbase autocomplete: {response.status_code}")
         return []
 
-def fetch_linkedin_url_from_crunchbase(permalink, crunchbase_api_key):
-    linkedin_check_url = f"https://api.crunchbase.com/api/v4/entities/organizations/{permalink}?field_ids=linkedin"
-    response = requests.get(linkedin_check_url, params={'user_key': crunchbase_api_key})
-    if response.status_code == 200:
-        json_response = response.json()
-        return json_response["properties"].get("linkedin", {}).get("value")
-    return None
-
-def find_matching_crunchbase_permalink(companies, linkedin_company_url, crunchbase_api_key):
-    for company in companies:
-        permalink = company["identifier"]["permalink"]
-        if linkedin_company_url:
-            linkedin_url = fetch_linkedin_url_from_crunchbase(permalink, crunchbase_api_key)
-            if linkedin_url == linkedin_company_url:
-                return permalink
-        else:
-            return permalink
-    return ""
+def linkedin_url_from_entity(entity):
+    return (entity.get("properties", {}).get("linkedin") or {}).get("value")
+
+def resolve_crunchbase_entity(companies, linkedin_company_url, crunchbase_api_key):
+    """Find which autocomplete candidate lists the given LinkedIn URL.
+
+    Candidates already in the permalink index are decided without a request. The others
+    are fetched concurrently on the shared candidate_fetcher pool with the full field set,
+    pending fetches being cancelled as soon as one matches. Returns (permalink, entity); entity is None when the match came
+    from the index and ("", None) when nothing matched.
+    """
+    permalinks = [company["identifier"]["permalink"] for company in companies]
+    if not permalinks:
+        return "", None
+
+    if not linkedin_company_url:
+        return permalinks[0], None
+
+    index = get_permalink_index()
+    target = normalize_linkedin_url(linkedin_company_url)
+    candidates = []
+
+    for permalink in permalinks:
+        known_url = index.linkedin_url(permalink)
+        if known_url == target:
+            return permalink, None
+        if known_url is None:
+            candidates.append(permalink)
+
+    futures = {candidate_fetcher.submit(fetch_crunchbase_data, permalink, crunchbase_api_key): permalink for permalink in candidates}
+    try:
+        for future in as_completed(futures):
+            try:
+                entity = future.result()
+            except Exception as e:
+                print(f"Failed to fetch Crunchbase entity {futures[future]}: {repr(e)}")
+                continue
+
+            linkedin_url = linkedin_url_from_entity(entity)
+            if linkedin_url:
+                index.add(futures[future], linkedin_url)
+            if linkedin_url and normalize_linkedin_url(linkedin_url) == target:
+                return futures[future], entity
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return "", None
 
 def fetch_crunchbase_data(crunchbase_company_url, crunchbase_api_key):
-    crunchbase_search_url = f"https://api.crunchbase.com/api/v4/entities/organizations/{crunchbase_company_url}?user_key={crunchbase_api_key}"
-    response = requests.get(crunchbase_search_url)
+    crunchbase_search_url = f"{CRUNCHBASE_API_URL}/entities/organizations/{crunchbase_company_url}"
+    params = {'user_key': crunchbase_api_key, 'field_ids': CRUNCHBASE_FIELD_IDS}
+    response = get_client("crunchbase").get(crunchbase_search_url, params=params)
     if response.status_code == 200:
         return response.json()
     else:
@@ -61,16 +147,18 @@ def search_crunchbase(company):
     crunchbase_data = {}
 
     if not crunchbase_company_url and linkedin_company_url:
-        crunchbase_company_url = get_crunchbase_company_url_from_linkedin(linkedin_company_url)
+        crunchbase_company_url = get_permalink_index().permalink(linkedin_company_url) or ""
 
     if not crunchbase_company_url:
         companies = search_crunchbase_autocomplete(company_name, crunchbase_api_key)
-        crunchbase_company_url = find_matching_crunchbase_permalink(companies, linkedin_company_url, crunchbase_api_key)
+        crunchbase_company_url, crunchbase_data = resolve_crunchbase_entity(companies, linkedin_company_url, crunchbase_api_key)
+        crunchbase_data = crunchbase_data or {}
         print("Crunchbase permalink found: ", crunchbase_company_url)
 
-    if crunchbase_company_url:
+    if crunchbase_company_url and not crunchbase_data:
         crunchbase_data = fetch_crunchbase_data(crunchbase_company_url, crunchbase_api_key)
-        if crunchbase_data:
-            print("Crunchbase data found: ", crunchbase_data)
+
+    if crunchbase_data:
+        print("Crunchbase data found: ", crunchbase_data)
 
     return crunchbase_data
@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from constants import ENTITY_STORE_PATH, ENTITY_MAX_AGE
+from linkedin import clean_linkedin_url
+
+
+class EntityStore:
+    """SQLite store of discovered companies and their per-source payloads.
+
+    Companies are keyed by their cleaned LinkedIn URL (Crunchbase permalinks live in the
+    crunchbase PermalinkIndex); every payload records when it was fetched so callers can
+    decide whether it is fresh enough to reuse.
+    """
+
+    def __init__(self, path=ENTITY_STORE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS companies (
+                linkedin_url TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                discovered_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS companies_name ON companies (name);
+            CREATE TABLE IF NOT EXISTS payloads (
+                linkedin_url TEXT NOT NULL,
+                source TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (linkedin_url, source)
+            );
+        """)
+        self.db.commit()
+
+    def add_company(self, name, linkedin_url):
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO companies (linkedin_url, name, discovered_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (linkedin_url) DO UPDATE SET name = excluded.name, discovered_at = excluded.discovered_at",
+                (clean_linkedin_url(linkedin_url), name, time.time())
+            )
+            self.db.commit()
+
+    def list_companies(self, max_age=ENTITY_MAX_AGE["discovery"]):
+        """Return the {"name", "linkedin_url"} of every company discovered within max_age seconds."""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT name, linkedin_url FROM companies WHERE discovered_at > ? ORDER BY discovered_at DESC",
+                (time.time() - max_age,)
+            ).fetchall()
+        return [{"name": name, "linkedin_url": linkedin_url} for name, linkedin_url in rows]
+
+    def get_payload(self, linkedin_url, source, max_age=None):
+        """Return the stored payload, or None when it is missing or older than max_age seconds."""
+        max_age = ENTITY_MAX_AGE.get(source, 0) if max_age is None else max_age
+        with self.lock:
+            row = self.db.execute(
+                "SELECT payload FROM payloads WHERE linkedin_url = ? AND source = ? AND fetched_at > ?",
+                (clean_linkedin_url(linkedin_url), source, time.time() - max_age)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_payload(self, linkedin_url, source, payload):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO payloads (linkedin_url, source, payload, fetched_at) VALUES (?, ?, ?, ?)",
+                (clean_linkedin_url(linkedin_url), source, json.dumps(payload), time.time())
+            )
+            self.db.commit()
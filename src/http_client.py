@@ -0,0 +1,131 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import requests
+from requests.adapters import HTTPAdapter
+from constants import (
+    HTTP_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF, HTTP_MAX_BACKOFF, HTTP_RETRY_STATUSES,
+    PROVIDER_RATE_LIMITS, PROVIDER_CONCURRENCY, MAX_WORKERS
+)
+from instrumentation import metrics
+
+
+class TokenBucket:
+    """Blocking token bucket allowing `rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class HttpClient:
+    """Keep-alive HTTP session for one provider with timeouts, rate limiting and retries.
+
+    Connections are pooled per host by the underlying requests session, and at most
+    pool_size requests are in flight at once so no connection is opened beyond the pool
+    and discarded. Requests failing
+    with a connection error, a timeout or a status in HTTP_RETRY_STATUSES are retried with
+    exponential backoff, waiting for the server's Retry-After instead when it sends one.
+    """
+
+    def __init__(self, provider, rate_limit=None, pool_size=None, timeout=HTTP_TIMEOUT, max_retries=HTTP_MAX_RETRIES, backoff=HTTP_BACKOFF):
+        self.provider = provider
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = TokenBucket(*rate_limit) if rate_limit else None
+
+        pool_size = pool_size or PROVIDER_CONCURRENCY.get(provider, MAX_WORKERS)
+        self.slots = threading.BoundedSemaphore(pool_size)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    async def aget(self, url, **kwargs):
+        return await asyncio.to_thread(self.get, url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter:
+                with metrics.span("http", f"{self.provider}.rate_limit_wait"):
+                    self.rate_limiter.acquire()
+
+            try:
+                with self.slots, metrics.span("http", self.provider, method=method, attempt=attempt):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt)
+                metrics.count(f"{self.provider}.retries")
+                print(f"{self.provider} request failed ({repr(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code not in HTTP_RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            delay = self.retry_after(response)
+            if delay is None:
+                delay = self.backoff_delay(attempt)
+            metrics.count(f"{self.provider}.retries")
+            print(f"{self.provider} request returned {response.status_code}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+
+    def backoff_delay(self, attempt):
+        return min(HTTP_MAX_BACKOFF, self.backoff * 2 ** attempt) * random.uniform(0.5, 1)
+
+    @staticmethod
+    def retry_after(response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+
+        try:
+            return min(HTTP_MAX_BACKOFF, max(0.0, float(value)))
+        except ValueError:
+            pass
+
+        try:
+            return min(HTTP_MAX_BACKOFF, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def get_client(provider):
+    """Return the HttpClient shared by every caller of the given provider."""
+    with clients_lock:
+        if provider not in clients:
+            clients[provider] = HttpClient(provider, rate_limit=PROVIDER_RATE_LIMITS.get(provider))
+        return clients[provider]
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from constants import LATENCY_BUCKETS_MS, MAX_TRACE_EVENTS
+
+
+class Instrumentation:
+    """Thread-safe collector of spans, counters and token usage for one run.
+
+    Spans are grouped by category ("stage", "llm", "http", "scraper") and name; each group
+    keeps a latency histogram over LATENCY_BUCKETS_MS. report() returns the aggregated,
+    JSON-serializable run report and write_chrome_trace() exports the individual spans
+    in the Chrome trace event format (chrome://tracing, Perfetto).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started_at = time.time()
+            self.origin = time.perf_counter()
+            self.latencies = {}
+            self.errors = {}
+            self.counters = {}
+            self.usage = {}
+            self.events = []
+
+    @contextmanager
+    def span(self, category, name, **attrs):
+        start = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.record_span(category, name, start, time.perf_counter() - start, attrs, error)
+
+    def record_span(self, category, name, start, duration, attrs=None, error=None):
+        key = f"{category}.{name}"
+        with self.lock:
+            self.latencies.setdefault(key, []).append(duration)
+            if error:
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+            if len(self.events) < MAX_TRACE_EVENTS:
+                args = {k: str(v) for k, v in (attrs or {}).items()}
+                if error:
+                    args["error"] = repr(error)
+                self.events.append({
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": (start - self.origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "pid": 1,
+                    "tid": threading.get_ident(),
+                    "args": args
+                })
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_usage(self, provider, model, usage):
+        """Add the token counts of a chat completion's `usage` to the provider/model totals."""
+        if not usage:
+            return
+
+        key = f"{provider}.{model}"
+        with self.lock:
+            totals = self.usage.setdefault(key, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "calls": 0})
+            totals["calls"] += 1
+            for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                totals[field] += getattr(usage, field, 0) or 0
+
+    def report(self):
+        with self.lock:
+            spans = {}
+            for key, durations in self.latencies.items():
+                ordered = sorted(durations)
+                buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+                for duration in ordered:
+                    buckets[bisect_left(LATENCY_BUCKETS_MS, duration * 1000)] += 1
+
+                spans[key] = {
+                    "count": len(ordered),
+                    "errors": self.errors.get(key, 0),
+                    "total_s": sum(ordered),
+                    "mean_ms": sum(ordered) / len(ordered) * 1000,
+                    "p50_ms": percentile(ordered, 50) * 1000,
+                    "p90_ms": percentile(ordered, 90) * 1000,
+                    "p99_ms": percentile(ordered, 99) * 1000,
+                    "max_ms": ordered[-1] * 1000,
+                    "histogram_ms": dict(zip([f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"], buckets))
+                }
+
+            return {
+                "started_at": self.started_at,
+                "wall_time_s": time.perf_counter() - self.origin,
+                "spans": spans,
+                "counters": dict(self.counters),
+                "token_usage": {key: dict(totals) for key, totals in self.usage.items()}
+            }
+
+    def write_report(self, path):
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=4)
+
+    def write_chrome_trace(self, path):
+        with self.lock:
+            events = list(self.events)
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+# Shared by every module of a run
+metrics = Instrumentation()
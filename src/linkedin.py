@@ -1,17 +1,11 @@
-import re
 import requests
 import os
+from constants import LINKEDIN_API_URL
+from http_client import get_client
+from names import clean_company_name
 
 def clean_company_names(companies_names):
-    parentheses_pattern = re.compile(r"\((.*?)\)", re.IGNORECASE)
-    unwanted_words = {"uk", "plc"}
-
-    def clean_name(name):
-        name = re.sub(parentheses_pattern, "", name).strip()
-        name = " ".join(word for word in name.split() if word.lower() not in unwanted_words)
-        return name
-
-    return [clean_name(company_name) for company_name in companies_names]
+    return [clean_company_name(company_name) for company_name in companies_names]
 
 def clean_linkedin_url(url):
     if url.endswith("/jobs"):
@@ -27,8 +21,8 @@ def search_linkedin(company):
     linkedin_company_url = clean_linkedin_url(company["linkedin_url"])
 
     try:
-        res = requests.get(
-            f"https://api.linkedin.com/v2/companies/{linkedin_company_url.split('/')[-1]}",
+        res = get_client("linkedin").get(
+            f"{LINKEDIN_API_URL}/companies/{linkedin_company_url.split('/')[-1]}",
             headers={'Authorization': f'Bearer {os.getenv("PPLX_API_KEY")}'}
         )
         res.raise_for_status()
@@ -1,12 +1,26 @@
 import json
+import math
 import traceback
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from scraper import Scraper
 from dotenv import load_dotenv
 from openai import OpenAI
-from constants import Actions, PromptText, SOURCES
+from openai.types.chat import ChatCompletion
+from constants import Actions, PromptText, SOURCES, SOURCE_RESULT_KEYS, SOURCE_KEYWORDS, DATA_ITEM_FORMATS, MAX_WORKERS, PROVIDER_CONCURRENCY, CACHE_TTLS, SOURCE_TOKEN_BUDGET, ENTITY_MAX_AGE, MAX_COMPANIES, PERPLEXITY_BASE_URL, FALLBACK_BATCH_SIZE, EXTRACTION_VERSION, SPECULATION_MIN_FIELDS, SPECULATION_MAX_PAIRS, SPECULATION_MAX_SHARE
+from cache import ResponseCache
+from entity_store import EntityStore
+from model_router import ModelRouter
+from result_store import ResultStore
+from concurrency import run_concurrently
+from pruning import prune_source, relevant_fields
+from pipeline import stream_pipeline
+from instrumentation import metrics
 from tqdm import tqdm
 from linkedin import clean_linkedin_url, clean_company_names, search_linkedin
+from names import NameIndex
 from crunchbase import search_crunchbase
 
 # Load environment variables
@@ -15,40 +29,115 @@ load_dotenv()
 
 class LLM:
 
-    def __init__(self):
+    def __init__(self, cache=True, store=True, max_age=None, router=None, result_store=None):
         self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.perplexity_client = OpenAI(api_key=os.getenv("PPLX_API_KEY"), base_url="https://api.perplexity.ai")
+        self.perplexity_client = OpenAI(api_key=os.getenv("PPLX_API_KEY"), base_url=PERPLEXITY_BASE_URL)
         self.piloterr_api_key = os.getenv("PILOTERR_API_KEY")
         self.crunchbase_api_key = os.getenv("CRUNCHBASE_API_KEY")
-        self.scraper = Scraper()
+        self.cache = ResponseCache() if cache is True else cache or None
+        self.scraper = Scraper(cache=self.cache)
+        self.store = EntityStore() if store is True else store or None
+        self.max_age = {**ENTITY_MAX_AGE, **(max_age or {})}
+        self.router = router or ModelRouter()
+        self.result_store = ResultStore() if result_store is True else result_store or None
+        self.source_plans = {}
+        self.pruning_stats = {"documents": 0, "tokens_before": 0, "tokens_after": 0, "tokens_saved": 0}
+        self.stats_lock = threading.Lock()
 
     def perform_action(self, action, *args, **kwargs):
-        match action:
-            case Actions.SEARCH_COMPANIES:
-                return self.search_companies(*args, **kwargs)
-            case Actions.SEARCH_USER_DATA_ITEMS:
-                return self.search_user_data_items(*args, **kwargs)
-            case Actions.LAUNCH_SEARCH_APIS:
-                return self.launch_search_apis(*args, **kwargs)
-            case Actions.EXTRACT_INFO:
-                return self.extract_info(*args, **kwargs)
-            case _:
-                raise ValueError(f"Unknown action: {action}")
-
-    def prompt(self, client, model="gpt-3.5-turbo-0125", response_format="json_object", temperature=0.1, system_prompt="", user_prompt="", max_tokens=500):
-        return client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=temperature,
-            response_format={"type": response_format}
-        )
+        if action == Actions.STREAM_PIPELINE:
+            # Timed by the pipeline itself, a span here would only cover creating the generator
+            return stream_pipeline(self, *args, **kwargs)
+
+        with metrics.span("stage", action.name):
+            match action:
+                case Actions.SEARCH_COMPANIES:
+                    return self.search_companies(*args, **kwargs)
+                case Actions.SEARCH_USER_DATA_ITEMS:
+                    return self.search_user_data_items(*args, **kwargs)
+                case Actions.LAUNCH_SEARCH_APIS:
+                    return self.launch_search_apis(*args, **kwargs)
+                case Actions.PLAN_DATA_SOURCES:
+                    return self.plan_data_sources(*args, **kwargs)
+                case Actions.EXTRACT_INFO:
+                    return self.extract_info(*args, **kwargs)
+                case _:
+                    raise ValueError(f"Unknown action: {action}")
+
+    def prompt(self, client, model=None, response_format="json_object", temperature=0.1, system_prompt="", user_prompt="", max_tokens=500, prompt_type=None):
+        """Send a chat completion, serving it from the response cache when possible.
+
+        Without an explicit model, the model router picks the prompt type's tier and
+        retries on the next tier when an escalating prompt type gets an unusable answer.
+        """
+        provider = "perplexity" if client is self.perplexity_client else "openai"
+        prompt_name = prompt_type.name if prompt_type else "UNTYPED"
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+        if model:
+            res, _ = self.complete(client, provider, prompt_name, prompt_type, model, messages, response_format, temperature, max_tokens)
+            return res
+
+        tier = self.router.tier(prompt_type)
+        while True:
+            started = time.perf_counter()
+            res, cached = self.complete(client, provider, prompt_name, prompt_type, self.router.model(provider, tier), messages, response_format, temperature, max_tokens)
+            acceptable = self.router.acceptable(res, response_format)
+
+            if not cached:
+                metrics.record_span("tier", f"{provider}.{tier}", started, time.perf_counter() - started, {"prompt_type": prompt_name})
+                metrics.count(f"tier.{provider}.{tier}.{'success' if acceptable else 'failure'}")
+
+            next_tier = None if acceptable else self.router.next_tier(prompt_type, tier)
+            if next_tier is None:
+                return res
+
+            metrics.count(f"escalation.{prompt_name}.{tier}->{next_tier}")
+            tier = next_tier
+
+    def complete(self, client, provider, prompt_name, prompt_type, model, messages, response_format, temperature, max_tokens):
+        ttl = CACHE_TTLS.get(prompt_type)
+        cache_key = None
+        if self.cache and ttl:
+            cache_key = ResponseCache.make_key(str(client.base_url), model, messages, temperature, max_tokens, response_format)
+            cached = self.cache.get(cache_key)
+            if cached:
+                metrics.count(f"cache.hit.{prompt_name}")
+                return ChatCompletion.model_validate_json(cached), True
+            metrics.count(f"cache.miss.{prompt_name}")
+
+        with metrics.span("llm", provider, prompt_type=prompt_name, model=model):
+            res = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                response_format={"type": response_format}
+            )
+
+        metrics.count(f"{provider}.calls.{prompt_name}")
+        metrics.record_usage(provider, model, getattr(res, "usage", None))
+
+        if cache_key and res and res.choices and res.choices[0].message.content:
+            self.cache.set(cache_key, res.model_dump_json(), ttl)
 
-    def search_companies(self, industry, region, size):
+        return res, False
+
+    def search_companies(self, industry, region, size, limit=MAX_COMPANIES):
         """Search for companies using the given industry and region, then find LinkedIn URLs."""
+        return list(self.iter_companies(industry, region, size, limit))
+
+    def iter_companies(self, industry, region, size, limit=MAX_COMPANIES):
+        """Yield each company found by search_companies as soon as its LinkedIn URL is known.
+
+        Names are cleaned and names with the same normalized form collapsed before scraping;
+        names matching a company in the entity store the same way reuse it. Merely similar
+        names are scraped, and companies resolving to a LinkedIn URL already yielded are
+        dropped; how often similar names turn out to be duplicates is counted.
+        """
 
         prompt = PromptText.SEARCH_COMPANIES.value.format(industry=industry, region=region, size=size)
         system_prompt = PromptText.SYSTEM_MARKET_RESEARCHER.value
@@ -56,9 +145,9 @@ class LLM:
         try:
             res = self.prompt(
                 self.perplexity_client, 
-                model="sonar-medium-online", 
                 system_prompt=system_prompt, 
-                user_prompt=prompt
+                user_prompt=prompt,
+                prompt_type=PromptText.SEARCH_COMPANIES
             )
 
             if not res.choices[0].message.content:
@@ -67,184 +156,679 @@ class LLM:
 
             companies = json.loads(res.choices[0].message.content)
             _, company_names = next(iter(companies.items()))
-            clean_company_names(company_names)
+            company_names = clean_company_names(company_names)
 
         except Exception as e:
             traceback.print_exc()
             print(repr(e))
-            return []
+            return
 
-        companies = []
-        for company_name in tqdm(company_names[:10]):
-            try:
-                res = self.scraper.call(company_name, industry, region)
+        known_companies = NameIndex()
+        for company in self.store.list_companies(self.max_age["discovery"]) if self.store else []:
+            known_companies.add(company["name"], company)
+
+        unique_names = NameIndex()
+        similar_names = {}
+        seen_urls = set()
+        tasks = []
+        for company_name in company_names:
+            if len(unique_names) == limit:
+                break
+            if unique_names.match(company_name, fuzzy=False) is not None:
+                metrics.count("discovery.duplicates")
+                continue
+
+            # A similar name may still be a different company, the LinkedIn URL found by scraping decides
+            similar_name = unique_names.match(company_name)
+            if similar_name is not None:
+                similar_names[company_name] = similar_name
+            unique_names.add(company_name)
+
+            known_company = known_companies.match(company_name, fuzzy=False)
+            if known_company and known_company["linkedin_url"] not in seen_urls:
+                seen_urls.add(known_company["linkedin_url"])
+                metrics.count("discovery.known")
+                yield known_company
+            elif not known_company:
+                tasks.append((company_name, "apify", self.scraper.call, (company_name, industry, region)))
+
+        for company_name, res, error in tqdm(run_concurrently(tasks, provider_limits=PROVIDER_CONCURRENCY), total=len(tasks)):
+            if error:
+                print(f"Failed to process {company_name}: {repr(error)}")
+                continue
+
+            if not res:
+                print(f"Skipping {company_name}: empty scraping results")
+                continue
+
+            url_links = [organic_res["url"] for organic_res in res.get("organicResults", []) if "linkedin" in organic_res["url"]]
+            if not url_links:
+                print(f"Skipping {company_name}: no LinkedIn URL found")
+                continue
+
+            company = {
+                "name": company_name,
+                "linkedin_url": clean_linkedin_url(url_links[0])
+            }
+
+            duplicate = company["linkedin_url"] in seen_urls
+            if company_name in similar_names:
+                metrics.count("discovery.similar_names_confirmed" if duplicate else "discovery.similar_names_distinct")
+
+            if duplicate:
+                print(f"Skipping {company_name}: duplicate of an already found company")
+                metrics.count("discovery.duplicates")
+                continue
+            seen_urls.add(company["linkedin_url"])
+
+            if self.store:
+                self.store.add_company(company_name, company["linkedin_url"])
+
+            yield company
+
+    def search_user_data_items(self, user_query, batched=True):
+        """Turn the user query into data items, each with a description, format and key information.
+
+        With batched=True all data items are specified in a single structured prompt; data items
+        missing from its answer, or all of them with batched=False, are specified with the
+        per-item prompts issued concurrently. With a result store, data items specified in an
+        earlier run reuse their stored specification.
+        """
+        res = self.prompt(
+            self.openai_client, 
+            system_prompt=PromptText.SYSTEM_ANALYST.value, 
+            user_prompt=PromptText.USER_DATA_ITEMS.value.format(user_query=user_query),
+            prompt_type=PromptText.USER_DATA_ITEMS
+        )
 
-                if not res:
-                    # TODO: error handling
-                    return
+        if not res or not res.choices[0].message.content:
+            # TODO: error handling
+            return
+
+        names = [data_item.strip() for data_item in json.loads(res.choices[0].message.content)['data_items']]
+        specs = {}
+
+        if self.result_store:
+            for name in names:
+                spec = self.result_store.get_spec(name)
+                if spec:
+                    specs[name] = spec
 
-                url_links = [organic_res["url"] for organic_res in res["organicResults"] if "linkedin" in organic_res["url"]]
-                linkedin_company_url = url_links[0]
-                linkedin_company_url = clean_linkedin_url(linkedin_company_url)
+        unspecified = [name for name in names if name not in specs]
+        if batched and unspecified:
+            specs.update(self.specify_data_items(unspecified))
 
-                companies.append({
-                    "name": company_name,
-                    "linkedin_url": linkedin_company_url
-                })
-            except Exception as e:
-                traceback.print_exc()
-                print(f"Failed to process {company_name}: {repr(e)}")
+        tasks = [(name, "openai", self.specify_data_item, (name,)) for name in names if name not in specs]
+        for name, spec, error in run_concurrently(tasks, provider_limits=PROVIDER_CONCURRENCY):
+            if error or not spec:
+                print(f"Failed to specify data item {name}: {repr(error) if error else 'empty answer'}")
+                continue
+            specs[name] = spec
+
+        if self.result_store:
+            for name in unspecified:
+                if name in specs:
+                    self.result_store.put_spec(specs[name])
+
+        data_items = {}
+        for name in names:
+            if name in specs:
+                data_items[f"data_item{len(data_items)+1}"] = specs[name]
 
-        return companies
+        return data_items
+
+    def specify_data_items(self, names):
+        res = self.prompt(
+            self.openai_client,
+            system_prompt=PromptText.SYSTEM_ANALYST.value,
+            user_prompt=PromptText.DATA_ITEMS_SPECIFICATION.value.format(
+                data_items=json.dumps(names),
+                formats=json.dumps(DATA_ITEM_FORMATS)
+            ),
+            max_tokens=200 * len(names),
+            prompt_type=PromptText.DATA_ITEMS_SPECIFICATION
+        )
+
+        if not res or not res.choices[0].message.content:
+            return {}
 
-    def search_user_data_items(self, user_query):
+        try:
+            answer = json.loads(res.choices[0].message.content)
+        except json.JSONDecodeError as e:
+            print(f"Invalid data items specification: {repr(e)}")
+            return {}
+
+        answer = answer.get("data_items") if isinstance(answer, dict) else None
+        if not isinstance(answer, list):
+            print("Invalid data items specification: no data_items list")
+            return {}
+
+        specs = {}
+        for spec in answer:
+            if not isinstance(spec, dict) or not isinstance(spec.get("name"), str) or spec["name"].strip() not in names:
+                continue
+
+            description = str(spec.get("description", "")).strip()
+            format = str(spec.get("format", "")).strip().lower()
+            info_list = spec.get("key_information")
+            if not description or format not in DATA_ITEM_FORMATS or not isinstance(info_list, list):
+                continue
+
+            specs[spec["name"].strip()] = {
+                "name": spec["name"].strip(),
+                "description": description,
+                "format": format,
+                "info_list": info_list
+            }
+
+        return specs
+
+    def specify_data_item(self, data_item):
         res = self.prompt(
             self.openai_client, 
             system_prompt=PromptText.SYSTEM_ANALYST.value, 
-            user_prompt=PromptText.USER_DATA_ITEMS.value.format(user_query=user_query)
+            user_prompt=PromptText.DATA_ITEM_DESCRIPTION.value.format(data_item=data_item),
+            temperature=0.7,
+            response_format="text",
+            max_tokens=150,
+            prompt_type=PromptText.DATA_ITEM_DESCRIPTION
         )
 
         if not res or not res.choices[0].message.content:
-            # TODO: error handling
             return
 
-        data = json.loads(res.choices[0].message.content)
-        data_items = {}
+        description = res.choices[0].message.content.strip()
 
-        for idx, data_item in enumerate(data['data_items']):
-            result = {}
+        res = self.prompt(
+            self.openai_client, 
+            system_prompt=PromptText.SYSTEM_ANALYST.value, 
+            user_prompt=PromptText.DATA_ITEM_FORMAT.value.format(data_item=data_item, data_item_description=description),
+            response_format="text",
+            max_tokens=150,
+            prompt_type=PromptText.DATA_ITEM_FORMAT
+        )
 
-            res = self.prompt(
-                self.openai_client, 
-                system_prompt=PromptText.SYSTEM_ANALYST.value, 
-                user_prompt=PromptText.DATA_ITEM_DESCRIPTION.value.format(data_item=data_item),
-                temperature=0.7,
-                response_format="text",
-                max_tokens=150
-            )
+        if not res or not res.choices[0].message.content:
+            return
 
-            if not res or not res.choices[0].message.content:
-                # TODO: error handling 
-                return
+        format = res.choices[0].message.content.strip().lower()
 
-            description = res.choices[0].message.content.strip()
+        res = self.prompt(
+            self.openai_client,
+            system_prompt=PromptText.SYSTEM_ANALYST.value,
+            user_prompt=PromptText.DATA_ITEM_INFO_LIST.value.format(data_item=data_item),
+            max_tokens=300,
+            prompt_type=PromptText.DATA_ITEM_INFO_LIST
+        )
 
-            res = self.prompt(
-                self.openai_client, 
-                system_prompt=PromptText.SYSTEM_ANALYST.value, 
-                user_prompt=PromptText.DATA_ITEM_FORMAT.value.format(data_item=data_item, data_item_description=description),
-                response_format="text",
-                max_tokens=150
-            )
+        if not res or not res.choices[0].message.content:
+            return
 
-            if not res or not res.choices[0].message.content:
-                # TODO: error handling 
-                return
+        info_list = json.loads(res.choices[0].message.content).get("key_information", [])
 
-            format = res.choices[0].message.content.strip().lower()
+        return {
+            "name": data_item,
+            "description": description,
+            "format": format,
+            "info_list": info_list
+        }
 
-            res = self.prompt(
-                self.openai_client,
-                system_prompt=PromptText.SYSTEM_ANALYST.value,
-                user_prompt=PromptText.DATA_ITEM_INFO_LIST.value.format(data_item=data_item),
-                max_tokens=300,
-            )
+    def launch_search_apis(self, companies_info, concurrent=True, max_workers=MAX_WORKERS, provider_limits=PROVIDER_CONCURRENCY, refresh="stale"):
+        """Fetch LinkedIn and Crunchbase data for every company.
 
-            if not res or not res.choices[0].message.content:
-                # TODO: error handling 
-                return
+        With concurrent=True all (company, source) lookups run on a thread pool,
+        bounded globally by max_workers and per source by provider_limits.
+        When an entity store is configured, refresh="stale" serves payloads younger than
+        max_age from it and only fetches missing or stale ones, refresh="all" fetches
+        everything again and refresh="none" never fetches. Fetched payloads are stored.
+        """
+        searches = {"linkedin": search_linkedin, "crunchbase": search_crunchbase}
+        results = {company["name"]: {} for company in companies_info}
+        pending = []
 
-            info_list = json.loads(res.choices[0].message.content).get("key_information", [])
+        for company in companies_info:
+            for source in searches:
+                payload = None
+                if self.store and refresh != "all" and company.get("linkedin_url"):
+                    payload = self.store.get_payload(company["linkedin_url"], source, self.max_age[source])
 
-            # Build the data item dictionary
-            result["name"] = data_item.strip()
-            result["description"] = description
-            result["format"] = format
-            result["info_list"] = info_list
+                if payload is not None or refresh == "none":
+                    results[company["name"]][source] = payload
+                else:
+                    pending.append((company, source))
 
-            data_items[f"data_item{idx+1}"] = result
+        if not concurrent:
+            for company, source in pending:
+                results[company["name"]][source] = searches[source](company)
+                self.store_payload(company, source, results[company["name"]][source])
 
-        return data_items
+            return results
 
-    def launch_search_apis(self, companies_info):
-        results = {}
+        tasks = [((company["name"], source), source, searches[source], (company,)) for company, source in pending]
+        companies_by_name = {company["name"]: company for company in companies_info}
 
-        for company in companies_info:
-            results[company["name"]] = {}
+        for (name, source), result, error in run_concurrently(tasks, max_workers, provider_limits):
+            if error:
+                print(f"Failed to search {source} for {name}: {repr(error)}")
+            results[name][source] = result
+            self.store_payload(companies_by_name[name], source, result)
 
-            company_linkedin = search_linkedin(company)
-            results[company["name"]]["linkedin"] =  company_linkedin
+        return results
 
-            company_crunchbase = search_crunchbase(company)
-            results[company["name"]]["crunchbase"] =  company_crunchbase
+    def store_payload(self, company, source, payload):
+        if not self.store or not payload or not company.get("linkedin_url"):
+            return
 
-        return results
+        self.store.put_payload(company["linkedin_url"], source, payload)
+
+    def plan_data_sources(self, data_items, router="llm"):
+        """Resolve which search results each data item should be extracted from.
+
+        The plan does not depend on the company, so it is computed once per data item
+        and memoized. router="keyword" uses SOURCE_KEYWORDS only and makes no LLM calls;
+        the LLM router also falls back to it when the model gives no usable answer.
+        Returns {data_item_name: [search result keys]}.
+        """
+        pending = {
+            data_item["name"]: data_item
+            for data_item in data_items.values()
+            if (router, data_item["name"]) not in self.source_plans
+        }
+
+        if router == "llm":
+            tasks = [(name, "openai", self.route_data_item, (data_item,)) for name, data_item in pending.items()]
+            for name, sources, error in run_concurrently(tasks, provider_limits=PROVIDER_CONCURRENCY):
+                if error or sources is None:
+                    print(f"Falling back to keyword routing for {name}: {repr(error) if error else 'no answer'}")
+                    sources = self.route_data_item_by_keywords(pending[name])
+                self.source_plans[(router, name)] = sources
+        else:
+            for name, data_item in pending.items():
+                self.source_plans[(router, name)] = self.route_data_item_by_keywords(data_item)
+
+        return {data_item["name"]: self.source_plans[(router, data_item["name"])] for data_item in data_items.values()}
+
+    def route_data_item(self, data_item):
+        res = self.prompt(
+            self.openai_client,
+            system_prompt=PromptText.SYSTEM_NEEDED_PROCESS.value,
+            user_prompt=PromptText.DATA_SOURCE_PROMPT.value.format(
+                data_item_name=data_item["name"],
+                sources=json.dumps(SOURCES, indent=4)
+            ),
+            prompt_type=PromptText.DATA_SOURCE_PROMPT
+        )
 
-    def extract_info(self, data_items, companies, search_results):
-        results = []
+        if not res or not res.choices[0].message.content:
+            return None
+
+        kept_data_sources = json.loads(res.choices[0].message.content).get("kept_data_sources")
+        if not isinstance(kept_data_sources, list):
+            return None
+
+        return [SOURCE_RESULT_KEYS[k] for k in kept_data_sources if k in SOURCE_RESULT_KEYS]
+
+    @staticmethod
+    def route_data_item_by_keywords(data_item):
+        """Route a data item with SOURCE_KEYWORDS; items matching no keyword are sent to every source."""
+        text = " ".join([data_item["name"], data_item.get("description", "")] + [str(info) for info in data_item.get("info_list", [])]).lower()
+        sources = [SOURCE_RESULT_KEYS[k] for k, keywords in SOURCE_KEYWORDS.items() if any(keyword in text for keyword in keywords)]
+
+        return sources or list(SOURCE_RESULT_KEYS.values())
+
+    def extract_info(self, data_items, companies, search_results, source_plan=None, batched=True, token_budget=SOURCE_TOKEN_BUDGET, fallback_grouping="company", speculate=False, max_speculative=SPECULATION_MAX_PAIRS):
+        """Extract every data item for every company from its search results.
+
+        With batched=True each company's source document is sent once with all the data
+        items routed to it; otherwise one prompt is issued per (data item, source).
+        Source documents are pruned to the fields relevant to the requested data items
+        within token_budget (None sends them whole). The (company, data item) pairs left
+        without an answer across the whole job fall back to direct LLM search prompts,
+        grouped by company or by data item (fallback_grouping) and run concurrently.
+        With a result store, cells whose inputs are unchanged since they were stored are
+        reused and only the others are extracted.
+
+        With speculate=True, the pairs whose routed sources have weak coverage (see
+        weak_pairs) start their direct search prompt right away, alongside source extraction.
+        A speculative answer arriving before its company's source extraction starts skips
+        that extraction; otherwise the source answer is kept and the speculative one only
+        fills in when the sources give nothing.
+        """
+        if source_plan is None:
+            source_plan = self.plan_data_sources(data_items)
+
+        answers = {}
+        fingerprints = {}
+        pending = {}
+        for company in companies:
+            company_sources = search_results.get(company["name"], {})
+            answers[company["name"]] = {}
+            pending[company["name"]] = {}
+
+            for key, data_item in data_items.items():
+                if self.result_store:
+                    fingerprint = self.cell_fingerprint(data_item, source_plan.get(data_item["name"], []), company_sources, batched, token_budget)
+                    found, answer = self.result_store.get_cell(company.get("linkedin_url") or company["name"], data_item["name"], fingerprint)
+                    if found:
+                        metrics.count("incremental.reused")
+                        if answer:
+                            answers[company["name"]][data_item["name"]] = answer
+                        continue
+                    fingerprints[(company["name"], data_item["name"])] = fingerprint
+
+                pending[company["name"]][key] = data_item
+
+        speculative_pairs = self.weak_pairs(pending, search_results, source_plan, max_speculative) if speculate else []
+        speculative_answers = {}
+        failed = set()
+        if speculative_pairs:
+            metrics.count("speculation.launched", len(speculative_pairs))
+            speculation = ThreadPoolExecutor(max_workers=1)
+            speculative_search = speculation.submit(self.search_fallback, speculative_pairs, fallback_grouping, found=speculative_answers, failed=failed)
+
+        fallback_pairs = []
+        for company in companies:
+            company_sources = search_results.get(company["name"], {})
+            company_pending = dict(pending[company["name"]])
+
+            for key, data_item in pending[company["name"]].items():
+                pair = (company["name"], data_item["name"])
+                if pair in speculative_answers:
+                    metrics.count("speculation.preempted")
+                    answers[company["name"]][data_item["name"]] = {"content": speculative_answers[pair], "source": "Google search"}
+                    del company_pending[key]
+
+            if not company_pending:
+                continue
+
+            failed_items = set()
+            if batched:
+                answers[company["name"]].update(self.extract_from_sources_batched(company_pending, company_sources, source_plan, token_budget, failed_items))
+            else:
+                answers[company["name"]].update(self.extract_from_sources(company_pending, company_sources, source_plan, token_budget, failed_items))
+            failed.update((company["name"], data_item_name) for data_item_name in failed_items)
+
+            unanswered = [(company["name"], data_item["name"]) for data_item in company_pending.values() if data_item["name"] not in answers[company["name"]]]
+            fallback_pairs.extend(unanswered)
+
+        if speculative_pairs:
+            speculative_search.result()
+            speculation.shutdown()
+
+            # Speculated pairs never go through the fallback again: it would send the same prompts
+            speculated = set(speculative_pairs)
+            fallback_pairs = [pair for pair in fallback_pairs if pair not in speculated]
+            for company_name, data_item_name in speculative_pairs:
+                answer = answers[company_name].get(data_item_name)
+                if answer is None and (company_name, data_item_name) in speculative_answers:
+                    answer = answers[company_name][data_item_name] = {"content": speculative_answers[(company_name, data_item_name)], "source": "Google search"}
+
+                if answer is None:
+                    metrics.count("speculation.unanswered")
+                elif answer["source"] == "Google search":
+                    metrics.count("speculation.won")
+                else:
+                    metrics.count("speculation.wasted")
+
+        for (company_name, data_item_name), content in self.search_fallback(fallback_pairs, fallback_grouping, failed=failed).items():
+            answers[company_name][data_item_name] = {"content": content, "source": "Google search"}
+
+        if self.result_store:
+            # An unanswered cell is only stored when every prompt for it was answered, a transient failure is retried next run
+            company_keys = {company["name"]: company.get("linkedin_url") or company["name"] for company in companies}
+            cells = [
+                (company_keys[company_name], data_item_name, fingerprint, answers[company_name].get(data_item_name))
+                for (company_name, data_item_name), fingerprint in fingerprints.items()
+                if data_item_name in answers[company_name] or (company_name, data_item_name) not in failed
+            ]
+            self.result_store.put_cells(cells)
+            metrics.count("incremental.recomputed", len(fingerprints))
+            metrics.count("incremental.not_stored", len(fingerprints) - len(cells))
 
+        results = []
         for company in companies:
             company_results = {"company": company["name"]}
-            required_data_items = {}
+            for data_item in data_items.values():
+                answer = answers[company["name"]].get(data_item["name"])
+                company_results[data_item["name"]] = answer["content"] if answer else None
+            results.append(company_results)
 
-            for _, data_item in data_items.items():
-                res = self.prompt(
-                    self.openai_client,
-                    system_prompt=PromptText.SYSTEM_NEEDED_PROCESS.value, 
-                    user_prompt=PromptText.DATA_SOURCE_PROMPT.value.format(
-                        data_item_name=data_item["name"],
-                        sources=json.dumps(SOURCES, indent=4)
-                    )
-                )
+        return results
+
+    def weak_pairs(self, pending, search_results, source_plan, max_pairs=SPECULATION_MAX_PAIRS):
+        """Return the pending (company name, data item name) pairs whose routed sources hold fewer than
+        SPECULATION_MIN_FIELDS relevant fields, capped at max_pairs and SPECULATION_MAX_SHARE of the pending pairs.
+        """
+        cap = min(max_pairs, math.ceil(SPECULATION_MAX_SHARE * sum(len(items) for items in pending.values())))
+        weak = []
+        for company_name, company_items in pending.items():
+            company_sources = search_results.get(company_name, {})
+            for data_item in company_items.values():
+                coverage = sum(relevant_fields(company_sources.get(source), [data_item]) for source in source_plan.get(data_item["name"], []))
+                if coverage < SPECULATION_MIN_FIELDS:
+                    weak.append((company_name, data_item["name"]))
+
+        if len(weak) > cap:
+            metrics.count("speculation.capped", len(weak) - cap)
+        return weak[:cap]
+
+    def cell_fingerprint(self, data_item, sources, company_sources, batched, token_budget):
+        """Hash every input an extracted (company, data item) cell depends on."""
+        prompt_types = [
+            PromptText.FIND_USER_DATA_ITEMS_BATCH_PROMPT if batched else PromptText.FIND_USER_DATA_ITEMS_PROMPT,
+            PromptText.SEARCH_LLM_EXTRACTION_PROMPT,
+            PromptText.SEARCH_LLM_BATCH_EXTRACTION_PROMPT,
+            PromptText.SEARCH_LLM_MULTI_COMPANY_EXTRACTION_PROMPT,
+        ]
+
+        return ResponseCache.make_key({
+            "version": EXTRACTION_VERSION,
+            "data_item": {key: data_item.get(key) for key in ("name", "description", "format", "info_list")},
+            "sources": {source: company_sources.get(source) for source in sorted(sources)},
+            "templates": [prompt_type.value for prompt_type in prompt_types],
+            "models": {prompt_type.name: self.router.tier(prompt_type) for prompt_type in prompt_types},
+            "model_tiers": self.router.model_tiers,
+            "token_budget": token_budget,
+        })
+
+    def search_fallback(self, pairs, grouping="company", batch_size=FALLBACK_BATCH_SIZE, found=None, failed=None):
+        """Answer (company name, data item name) pairs with direct LLM search prompts.
+
+        Pairs are grouped by company (several data items per prompt) or by data item
+        (several companies per prompt) in groups of at most batch_size, and the groups run
+        concurrently. Returns {(company name, data item name): answer} for the answered pairs;
+        when found is given, it is filled in as each group completes and returned. Pairs of
+        groups that raised or got no valid answer are added to failed.
+        """
+        groups = {}
+        for company_name, data_item_name in pairs:
+            key = company_name if grouping == "company" else data_item_name
+            groups.setdefault(key, []).append((company_name, data_item_name))
+
+        tasks = []
+        for key, group in groups.items():
+            for start in range(0, len(group), batch_size):
+                chunk = group[start:start + batch_size]
+                tasks.append(((key, start), "openai", self.search_fallback_group, (chunk, grouping)))
+
+        chunks = {task_key: chunk for task_key, _, _, (chunk, _) in tasks}
+        found = {} if found is None else found
+        failed = set() if failed is None else failed
+        for task_key, group_answers, error in run_concurrently(tasks, provider_limits=PROVIDER_CONCURRENCY):
+            if error or group_answers is None:
+                if error:
+                    print(f"Search fallback failed for {task_key[0]}: {repr(error)}")
+                failed.update(chunks[task_key])
+                continue
+            found.update(group_answers)
+
+        return found
+
+    def search_fallback_group(self, pairs, grouping):
+        """Return {pair: answer} for the pairs answered, or None when the model gave no valid answer."""
+        if len(pairs) == 1:
+            company_name, data_item_name = pairs[0]
+            res = self.prompt(
+                self.openai_client,
+                system_prompt=PromptText.SYSTEM_MARKET_RESEARCHER.value,
+                user_prompt=PromptText.SEARCH_LLM_EXTRACTION_PROMPT.value.format(data_item=data_item_name, company_name=company_name),
+                response_format="text",
+                prompt_type=PromptText.SEARCH_LLM_EXTRACTION_PROMPT
+            )
+
+            if not res or not res.choices[0].message.content:
+                return None
+
+            data = res.choices[0].message.content.strip()
+            return {pairs[0]: data} if data.lower() != "none" else {}
+
+        if grouping == "company":
+            company_name = pairs[0][0]
+            keys = {pair[1]: pair for pair in pairs}
+            prompt_type = PromptText.SEARCH_LLM_BATCH_EXTRACTION_PROMPT
+            user_prompt = prompt_type.value.format(company_name=company_name, data_items=json.dumps(list(keys)))
+        else:
+            data_item_name = pairs[0][1]
+            keys = {pair[0]: pair for pair in pairs}
+            prompt_type = PromptText.SEARCH_LLM_MULTI_COMPANY_EXTRACTION_PROMPT
+            user_prompt = prompt_type.value.format(data_item=data_item_name, company_names=json.dumps(list(keys)))
+
+        res = self.prompt(
+            self.openai_client,
+            system_prompt=PromptText.SYSTEM_MARKET_RESEARCHER.value,
+            user_prompt=user_prompt,
+            max_tokens=100 * len(pairs),
+            prompt_type=prompt_type
+        )
+
+        if not res or not res.choices[0].message.content:
+            return None
+
+        try:
+            answer = json.loads(res.choices[0].message.content)
+        except json.JSONDecodeError as e:
+            print(f"Invalid search fallback answer: {repr(e)}")
+            return None
+
+        if not isinstance(answer, dict):
+            print("Invalid search fallback answer: not a JSON object")
+            return None
 
-                if not res or not res.choices[0].message.content: 
-                # TODO: error handling 
-                    return 
+        found = {}
+        for key, pair in keys.items():
+            value = answer.get(key)
+            if value is not None and str(value).strip().lower() not in ("", "none"):
+                found[pair] = value
 
-                required_data_items[data_item["name"]] = json.loads(res.choices[0].message.content).get('kept_data_sources')
+        return found
 
-            filtered_data_items = []
-            for key, data_sources in required_data_items.items():
-                filtered_data_items.extend([search_results[company["name"]][k] for k in data_sources if k in search_results[company["name"]]])
+    def source_document(self, payload, data_items, token_budget):
+        if token_budget is None:
+            return payload
+
+        pruned, report = prune_source(payload, data_items, token_budget)
+
+        with self.stats_lock:
+            self.pruning_stats["documents"] += 1
+            for key, value in report.items():
+                self.pruning_stats[key] += value
+
+        metrics.count("pruning.tokens_saved", report["tokens_saved"])
+
+        return json.dumps(pruned, default=str)
+
+    def extract_from_sources(self, data_items, company_sources, source_plan, token_budget=SOURCE_TOKEN_BUDGET, failed=None):
+        """Answer each data item from its routed sources, adding to failed the items a prompt got no completion for."""
+        answers = {}
+        failed = set() if failed is None else failed
+
+        for data_item in data_items.values():
+            for source in source_plan.get(data_item["name"], []):
+                payload = company_sources.get(source)
+                if not payload:
+                    continue
 
-            answers = []
-            for data_item in filtered_data_items:
                 res = self.prompt(
                     self.openai_client,
                     temperature=0.7, 
                     system_prompt=PromptText.SYSTEM_HELPFUL_BOT.value, 
                     user_prompt=PromptText.FIND_USER_DATA_ITEMS_PROMPT.value.format(
-                        data=data_item, 
-                        data_item=company["name"]
-                    )
+                        data=self.source_document(payload, [data_item], token_budget), 
+                        data_item=data_item["name"]
+                    ),
+                    response_format="text",
+                    prompt_type=PromptText.FIND_USER_DATA_ITEMS_PROMPT
                 )
 
                 if not res or not res.choices[0].message.content:
+                    failed.add(data_item["name"])
                     continue
 
                 data = res.choices[0].message.content.strip()
                 if data.lower() != "none":
-                    answers.append({"content": data, "source": data_item.get("source", "")})
-
-            if not answers:
-                for key in required_data_items.keys():
-                    res = self.prompt(
-                        self.openai_client,
-                        system_prompt=PromptText.SYSTEM_MARKET_RESEARCHER.value,
-                        user_prompt=PromptText.SEARCH_LLM_EXTRACTION_PROMPT.value.format(data_item=key, company_name=company["name"])
-                    )
-
-                    if not res or not res.choices[0].message.content:
-                        return
-
-                    answers.append({"content": res.choices[0].message.content, "source": "Google search"})
-
-            for key in required_data_items.keys():
-                company_results[key] = answers[0]['content'] if answers else None
-
-            results.append(company_results)
-
-        return results
+                    answers[data_item["name"]] = {"content": data, "source": payload.get("source", source)}
+                    break
+
+        return answers
+
+    def extract_from_sources_batched(self, data_items, company_sources, source_plan, token_budget=SOURCE_TOKEN_BUDGET, failed=None):
+        """Answer the data items routed to each source in one prompt per source, adding to failed
+        the items of a prompt that got no completion or an invalid one.
+        """
+        answers = {}
+        failed = set() if failed is None else failed
+
+        for source, payload in company_sources.items():
+            if not payload:
+                continue
+
+            requested = [
+                data_item for data_item in data_items.values()
+                if source in source_plan.get(data_item["name"], []) and data_item["name"] not in answers
+            ]
+            if not requested:
+                continue
+
+            specs = [
+                {
+                    "name": data_item["name"],
+                    "description": data_item.get("description", ""),
+                    "format": data_item.get("format", ""),
+                    "key_information": data_item.get("info_list", [])
+                }
+                for data_item in requested
+            ]
 
+            res = self.prompt(
+                self.openai_client,
+                system_prompt=PromptText.SYSTEM_HELPFUL_BOT.value,
+                user_prompt=PromptText.FIND_USER_DATA_ITEMS_BATCH_PROMPT.value.format(
+                    data=self.source_document(payload, requested, token_budget),
+                    data_items=json.dumps(specs, indent=4)
+                ),
+                max_tokens=150 * len(requested),
+                prompt_type=PromptText.FIND_USER_DATA_ITEMS_BATCH_PROMPT
+            )
 
+            if not res or not res.choices[0].message.content:
+                failed.update(data_item["name"] for data_item in requested)
+                continue
 
+            try:
+                extracted = json.loads(res.choices[0].message.content)
+            except json.JSONDecodeError as e:
+                print(f"Invalid batched extraction answer from {source}: {repr(e)}")
+                failed.update(data_item["name"] for data_item in requested)
+                continue
+
+            if not isinstance(extracted, dict):
+                print(f"Invalid batched extraction answer from {source}: not a JSON object")
+                failed.update(data_item["name"] for data_item in requested)
+                continue
+
+            for data_item in requested:
+                value = extracted.get(data_item["name"])
+                if value is not None and str(value).strip().lower() not in ("", "none"):
+                    answers[data_item["name"]] = {"content": value, "source": payload.get("source", source)}
+
+        return answers
@@ -1,22 +1,48 @@
 from llm import LLM
 from constants import Actions
+from columnar import ColumnarWriter
+from instrumentation import metrics
 import json
 
 
-def main(query, industry, region, size):
+def main(query, industry, region, size, stream=False, output="results", report="run_report.json", trace=None):
     llm = LLM()
 
+    try:
+        with ColumnarWriter(output) as writer:
+            if stream:
+                for result in llm.perform_action(Actions.STREAM_PIPELINE, query, industry, region, size, on_search_results=writer.add_sources):
+                    writer.write(result)
+                    print(json.dumps(result))
+            else:
+                run_stages(llm, query, industry, region, size, writer)
+        print(f"Results written to {output}/")
+    finally:
+        if llm.cache:
+            metrics.count("cache.memory_hits", llm.cache.hits["memory"])
+            metrics.count("cache.disk_hits", llm.cache.hits["disk"])
+            metrics.count("cache.misses", llm.cache.misses)
+        metrics.write_report(report)
+        if trace:
+            metrics.write_chrome_trace(trace)
+
+
+def run_stages(llm, query, industry, region, size, writer):
     companies_info = llm.perform_action(Actions.SEARCH_COMPANIES, industry, region, size)
     print(json.dumps(companies_info, indent=4))
 
     data_items = llm.perform_action(Actions.SEARCH_USER_DATA_ITEMS, query)
     print(json.dumps(data_items, indent=4))
 
-    results = llm.perform_action(Actions.LAUNCH_SEARCH_APIS, companies_info)
-    print(json.dumps(results, indent=4))
+    search_results = llm.perform_action(Actions.LAUNCH_SEARCH_APIS, companies_info)
 
-    results = llm.perform_action(Actions.EXTRACT_INFO, data_items, companies_info, results)
-    print(json.dumps(results, indent=4))
+    source_plan = llm.perform_action(Actions.PLAN_DATA_SOURCES, data_items)
+    print(json.dumps(source_plan, indent=4))
+
+    results = llm.perform_action(Actions.EXTRACT_INFO, data_items, companies_info, search_results, source_plan=source_plan)
+    for result in results:
+        writer.write(result, search_results.get(result["company"], {}))
+    print("Source pruning: ", llm.pruning_stats)
 
 
 main("Companies realising revolutionary AI products born in the last 7 years",
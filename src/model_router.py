@@ -0,0 +1,47 @@
+import json
+from constants import TIER_ORDER, MODEL_TIERS, PROMPT_TIERS, ESCALATING_PROMPTS
+
+EMPTY_ANSWERS = ("", "none", "null")
+
+
+class ModelRouter:
+    """Assign each prompt type a model tier and decide when an answer warrants escalation."""
+
+    def __init__(self, model_tiers=MODEL_TIERS, prompt_tiers=PROMPT_TIERS, escalating_prompts=ESCALATING_PROMPTS, tier_order=TIER_ORDER):
+        self.model_tiers = model_tiers
+        self.prompt_tiers = prompt_tiers
+        self.escalating_prompts = escalating_prompts
+        self.tier_order = tier_order
+
+    def tier(self, prompt_type):
+        return self.prompt_tiers.get(prompt_type, self.tier_order[0])
+
+    def model(self, provider, tier):
+        return self.model_tiers[provider][tier]
+
+    def next_tier(self, prompt_type, tier):
+        """Return the tier to retry an unusable answer on, or None when it should be kept."""
+        if prompt_type not in self.escalating_prompts:
+            return None
+
+        position = self.tier_order.index(tier)
+        return self.tier_order[position + 1] if position + 1 < len(self.tier_order) else None
+
+    @staticmethod
+    def acceptable(res, response_format):
+        if not res or not res.choices or not res.choices[0].message.content:
+            return False
+
+        content = res.choices[0].message.content.strip()
+        if response_format != "json_object":
+            return content.lower() not in EMPTY_ANSWERS
+
+        try:
+            answer = json.loads(content)
+        except json.JSONDecodeError:
+            return False
+
+        return isinstance(answer, dict) and any(
+            value is not None and str(value).strip().lower() not in EMPTY_ANSWERS
+            for value in answer.values()
+        )
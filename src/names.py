@@ -0,0 +1,91 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from constants import LEGAL_SUFFIXES, NAME_MATCH_THRESHOLD
+
+PARENTHESES_PATTERN = re.compile(r"\(.*?\)")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s]+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+DIGITS_PATTERN = re.compile(r"\d+")
+
+
+def clean_company_name(name):
+    """Drop parenthesized notes and trailing legal suffixes from a display name, keeping its case."""
+    words = WHITESPACE_PATTERN.split(PARENTHESES_PATTERN.sub(" ", name).strip())
+    while len(words) > 1 and PUNCTUATION_PATTERN.sub("", words[-1]).lower() in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words).rstrip(",")
+
+
+def normalize_name(name):
+    """Return the comparison key of a company name: lowercase ASCII words without punctuation or legal suffixes."""
+    name = unicodedata.normalize("NFKD", PARENTHESES_PATTERN.sub(" ", name)).encode("ascii", "ignore").decode()
+    words = PUNCTUATION_PATTERN.sub(" ", name.lower().replace("&", " and ")).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def trigrams(key):
+    compact = f"  {key.replace(' ', '')} "
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+class NameIndex:
+    """Blocking index of company names for exact and fuzzy duplicate lookups.
+
+    Names are compared by their normalized key. Fuzzy candidates are only drawn from the
+    names sharing at least half of the lookup's character trigrams, and names with different
+    numbers never match ("Company 1", "Company 10"), so a lookup stays cheap on large sets.
+    """
+
+    def __init__(self, threshold=NAME_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.exact = {}
+        self.blocks = {}
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, name, value=None):
+        key = normalize_name(name)
+        if not key:
+            return
+
+        value = value if value is not None else name
+        grams = trigrams(key)
+        self.exact.setdefault(key, value)
+        self.entries.append((key, value, grams, DIGITS_PATTERN.findall(key)))
+        for gram in grams:
+            self.blocks.setdefault(gram, []).append(len(self.entries) - 1)
+
+    def match(self, name, fuzzy=True):
+        """Return the value added under the closest name to this one, or None below the threshold.
+
+        With fuzzy=False only a name with the same normalized key matches.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        if key in self.exact or not fuzzy:
+            return self.exact.get(key)
+
+        # A name sharing half of the trigrams shares at least one of the rarest ones, so only their blocks are scanned
+        grams = sorted(trigrams(key), key=lambda gram: len(self.blocks.get(gram, ())))
+        needed = (len(grams) + 1) // 2
+        candidates = {position for gram in grams[:len(grams) - needed + 1] for position in self.blocks.get(gram, ())}
+
+        digits = DIGITS_PATTERN.findall(key)
+        best, best_score = None, self.threshold
+        for position in candidates:
+            candidate, value, candidate_grams, candidate_digits = self.entries[position]
+            if candidate_digits != digits or len(candidate_grams.intersection(grams)) < needed:
+                continue
+
+            score = SequenceMatcher(None, key, candidate).ratio()
+            if score >= best_score:
+                best, best_score = value, score
+
+        return best
+
@@ -0,0 +1,72 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from constants import MAX_WORKERS, MAX_COMPANIES
+from instrumentation import metrics
+
+
+def stream_pipeline(llm, query, industry, region, size, limit=MAX_COMPANIES, max_workers=MAX_WORKERS, on_search_results=None, **extract_kwargs):
+    """Run every stage per company and yield each company's extracted result as soon as it is ready.
+
+    Data item planning starts alongside discovery, and each discovered company goes straight
+    to enrichment and then extraction without waiting for the others. Only the companies
+    currently in flight keep their raw search results in memory; on_search_results(company,
+    search_results) is called with them before extraction, e.g. to persist them. Closing
+    the generator early stops discovery and waits for the companies already in flight.
+    """
+    finished = queue.Queue()
+    started = time.perf_counter()
+    stopped = threading.Event()
+    submit_lock = threading.Lock()
+
+    def timed(stage, fn, *args):
+        with metrics.span("stage", stage):
+            return fn(*args)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        data_items = executor.submit(timed, "SEARCH_USER_DATA_ITEMS", llm.search_user_data_items, query)
+        source_plan = executor.submit(lambda: timed("PLAN_DATA_SOURCES", llm.plan_data_sources, data_items.result() or {}))
+
+        def process(company):
+            try:
+                with metrics.span("stage", "LAUNCH_SEARCH_APIS", company=company["name"]):
+                    search_results = llm.launch_search_apis([company])
+                if on_search_results:
+                    on_search_results(company, search_results[company["name"]])
+                with metrics.span("stage", "EXTRACT_INFO", company=company["name"]):
+                    result = llm.extract_info(data_items.result() or {}, [company], search_results, source_plan=source_plan.result(), **extract_kwargs)[0]
+                finished.put((company, result, None))
+            except Exception as e:
+                finished.put((company, None, e))
+
+        def discover():
+            futures = []
+            try:
+                with metrics.span("stage", "SEARCH_COMPANIES"):
+                    for company in llm.iter_companies(industry, region, size, limit):
+                        with submit_lock:
+                            if stopped.is_set():
+                                break
+                            futures.append(executor.submit(process, company))
+            except Exception as e:
+                print(f"Company discovery failed: {repr(e)}")
+            finally:
+                wait(futures)
+                finished.put(None)
+
+        threading.Thread(target=discover, daemon=True).start()
+
+        try:
+            while (item := finished.get()) is not None:
+                company, result, error = item
+                if error:
+                    print(f"Failed to process {company['name']}: {repr(error)}")
+                    continue
+                yield result
+        finally:
+            # Closed early: stop discovery before the executor shuts down
+            with submit_lock:
+                stopped.set()
+            metrics.record_span("stage", "STREAM_PIPELINE", started, time.perf_counter() - started)
+
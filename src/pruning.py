@@ -0,0 +1,113 @@
+import json
+import re
+from constants import SOURCE_TOKEN_BUDGET, ALWAYS_KEPT_FIELDS
+
+WORD_PATTERN = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+")
+STEM_LENGTH = 5
+# Extra stems a data item term also matches, for fields whose names differ from how users phrase them
+TERM_SYNONYMS = {
+    "headq": {"locat", "hq", "addre", "city", "count"},
+    "city": {"locat"},
+    "count": {"locat"},
+    "addre": {"locat"},
+    "fundi": {"raise", "round", "inves", "money"},
+    "inves": {"fundi", "round"},
+    "emplo": {"staff", "size", "headc"},
+    "found": {"incor", "start"},
+    "socia": {"linke", "twitt", "faceb"},
+    "websi": {"homep", "domai", "url"},
+}
+IGNORED_TERMS = {"the", "and", "for", "with", "company", "companys", "information", "data", "number", "type", "value"}
+
+
+def estimate_tokens(text):
+    """Cheap local token estimate, roughly four characters per token for English and JSON."""
+    return (len(text) + 3) // 4
+
+
+def flatten(payload, prefix=""):
+    """Flatten nested dicts and lists into {field path: scalar value}, e.g. {"funding.rounds[0].amount": 10}."""
+    fields = {}
+
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            fields.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(payload, list):
+        for idx, value in enumerate(payload):
+            fields.update(flatten(value, f"{prefix}[{idx}]"))
+    elif payload not in (None, "", [], {}):
+        fields[prefix] = payload
+
+    return fields
+
+
+def stems(text):
+    return {word.lower()[:STEM_LENGTH] for word in WORD_PATTERN.findall(str(text)) if len(word) > 2 and word.lower() not in IGNORED_TERMS}
+
+
+def expand(terms):
+    expanded = set(terms)
+    for term in terms:
+        expanded |= TERM_SYNONYMS.get(term, set())
+    return expanded
+
+
+def item_terms(data_items):
+    terms = set()
+    for data_item in data_items:
+        terms |= stems(data_item["name"])
+        for info in data_item.get("info_list", []):
+            terms |= stems(info)
+
+    return expand(terms)
+
+
+def relevant_fields(payload, data_items):
+    """Count the fields of a source payload whose path shares stems with the data items' names or key information."""
+    if not payload:
+        return 0
+
+    terms = item_terms(data_items)
+    return sum(1 for path in flatten(payload) if stems(path) & terms)
+
+
+def prune_source(payload, data_items, token_budget=SOURCE_TOKEN_BUDGET):
+    """Keep only the fields of a source payload relevant to the given data items, within a token budget.
+
+    A field is relevant when its path shares stems with the data items' names or key
+    information. Identifying fields (ALWAYS_KEPT_FIELDS) come first, then relevant fields
+    by number of shared stems. When no field is relevant the whole payload is kept in its
+    original order, truncated to the budget. Returns the pruned {field path: value} dict
+    and a {"tokens_before", "tokens_after", "tokens_saved"} report.
+    """
+    terms = item_terms(data_items)
+    fields = flatten(payload)
+    ranked = []
+    for position, (path, value) in enumerate(fields.items()):
+        last_segment = re.sub(r"\[\d+\]", "", path.rsplit(".", 1)[-1]).lower()
+        score = len(stems(path) & terms)
+        ranked.append((-score, last_segment not in ALWAYS_KEPT_FIELDS, position, path, value))
+
+    if any(score < 0 for score, *_ in ranked):
+        ranked = sorted(
+            [field for field in ranked if field[0] < 0 or not field[1]],
+            key=lambda field: (field[1], field[0], field[2])
+        )
+
+    pruned = {}
+    used_tokens = 2
+    for _, _, _, path, value in ranked:
+        field_tokens = estimate_tokens(json.dumps({path: value}, default=str))
+        if used_tokens + field_tokens > token_budget:
+            continue
+        pruned[path] = value
+        used_tokens += field_tokens
+
+    tokens_before = estimate_tokens(json.dumps(payload, default=str))
+    tokens_after = estimate_tokens(json.dumps(pruned, default=str))
+
+    return pruned, {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": max(tokens_before - tokens_after, 0)
+    }
@@ -0,0 +1,66 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from constants import RESULT_STORE_PATH
+
+
+class ResultStore:
+    """SQLite store of extracted cells and data item specifications for incremental re-runs.
+
+    Each (company, data item) cell keeps the fingerprint of the inputs it was computed from;
+    a cell is reused only while the fingerprint of its current inputs is unchanged. Data item
+    specifications are kept by name so the same data item keeps the same specification, and
+    therefore the same fingerprint, across queries.
+    """
+
+    def __init__(self, path=RESULT_STORE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS cells (
+                company TEXT NOT NULL,
+                data_item TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                computed_at REAL NOT NULL,
+                PRIMARY KEY (company, data_item)
+            );
+            CREATE TABLE IF NOT EXISTS data_item_specs (
+                name TEXT PRIMARY KEY,
+                spec TEXT NOT NULL
+            );
+        """)
+        self.db.commit()
+
+    def get_cell(self, company, data_item, fingerprint):
+        """Return (True, answer) when the stored cell was computed from the same inputs, else (False, None)."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT answer FROM cells WHERE company = ? AND data_item = ? AND fingerprint = ?",
+                (company, data_item, fingerprint)
+            ).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def put_cells(self, cells):
+        """Store (company, data item, fingerprint, answer) cells; answer is None when nothing was found."""
+        now = time.time()
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO cells (company, data_item, fingerprint, answer, computed_at) VALUES (?, ?, ?, ?, ?)",
+                [(company, data_item, fingerprint, json.dumps(answer), now) for company, data_item, fingerprint, answer in cells]
+            )
+            self.db.commit()
+
+    def get_spec(self, name):
+        with self.lock:
+            row = self.db.execute("SELECT spec FROM data_item_specs WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_spec(self, spec):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO data_item_specs (name, spec) VALUES (?, ?)", (spec["name"], json.dumps(spec)))
+            self.db.commit()
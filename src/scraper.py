@@ -1,16 +1,30 @@
+import asyncio
+import json
 import os
-from apify_client import ApifyClient
+from apify_client import ApifyClient, ApifyClientAsync
+from cache import ResponseCache
+from constants import APIFY_API_URL, APIFY_ACTOR_ID, SCRAPER_CACHE_TTL, PROVIDER_CONCURRENCY
+from instrumentation import metrics
 
 class Scraper:
-    company_name = ""
-    industry = ""
-    region = ""
+    """Run the Google search actor for a company and return its first result page.
 
-    def __init__(self):
-        self.apify_client = ApifyClient(os.getenv("APIFY_API_TOKEN"))
+    Results are cached by the exact actor input, so a query already scraped within
+    SCRAPER_CACHE_TTL reuses its result instead of starting a new actor run. call() is
+    blocking; acall() and call_many() use the async Apify client, with at most
+    max_concurrent_runs actor runs in flight. client and async_client can be replaced by
+    any objects with the same interface, e.g. an offline mock actor backend.
+    """
 
-    def call(self, company_name, industry, region):
-        options = {
+    def __init__(self, cache=None, client=None, async_client=None, max_concurrent_runs=PROVIDER_CONCURRENCY["apify"]):
+        self.cache = cache
+        self.apify_client = client or ApifyClient(os.getenv("APIFY_API_TOKEN"), api_url=APIFY_API_URL)
+        self.async_client = async_client
+        self.max_concurrent_runs = max_concurrent_runs
+
+    @staticmethod
+    def options(company_name, industry, region):
+        return {
                 "queries": f"{company_name} {industry} in {region} site:www.linkedin.com/company/",
                 "maxPagesPerQuery": 1,
                 "resultsPerPage": 10,
@@ -27,12 +41,77 @@ class Scraper:
                 };"""
             }
 
+    def cached(self, key):
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            metrics.count("scraper.cache_hits")
+            return True, json.loads(cached)
+
+        metrics.count("scraper.cache_misses")
+        return False, None
+
+    def remember(self, key, item):
+        if self.cache and item:
+            self.cache.set(key, json.dumps(item), SCRAPER_CACHE_TTL)
 
-        res = self.apify_client.actor("nFJndFXA5zjCTuudP").call(run_input=options)
+    def call(self, company_name, industry, region):
+        options = self.options(company_name, industry, region)
+        key = ResponseCache.make_key("apify", APIFY_ACTOR_ID, options)
+        found, item = self.cached(key)
+        if found:
+            return item
+
+        with metrics.span("scraper", "apify", company_name=company_name):
+            res = self.apify_client.actor(APIFY_ACTOR_ID).call(run_input=options)
 
         if not res or res == []:
             # TODO: error handling
             print("Empty scraping results.")
             return
 
-        return list(self.apify_client.dataset(res["defaultDatasetId"]).iterate_items())[0]
+        # Only the first item is used, so only the first item is fetched
+        with metrics.span("scraper", "apify.dataset", company_name=company_name):
+            item = next(iter(self.apify_client.dataset(res["defaultDatasetId"]).iterate_items(limit=1)), None)
+
+        self.remember(key, item)
+        return item
+
+    async def acall(self, company_name, industry, region, semaphore=None):
+        options = self.options(company_name, industry, region)
+        key = ResponseCache.make_key("apify", APIFY_ACTOR_ID, options)
+        found, item = self.cached(key)
+        if found:
+            return item
+
+        if self.async_client is None:
+            self.async_client = ApifyClientAsync(os.getenv("APIFY_API_TOKEN"), api_url=APIFY_API_URL)
+
+        async with semaphore or asyncio.Semaphore(1):
+            with metrics.span("scraper", "apify", company_name=company_name):
+                res = await self.async_client.actor(APIFY_ACTOR_ID).call(run_input=options)
+
+            if not res or res == []:
+                print("Empty scraping results.")
+                return
+
+            with metrics.span("scraper", "apify.dataset", company_name=company_name):
+                item = None
+                async for item in self.async_client.dataset(res["defaultDatasetId"]).iterate_items(limit=1):
+                    break
+
+        self.remember(key, item)
+        return item
+
+    async def acall_many(self, queries):
+        semaphore = asyncio.Semaphore(self.max_concurrent_runs)
+        unique = list(dict.fromkeys(tuple(query) for query in queries))
+        results = await asyncio.gather(*[self.acall(*query, semaphore=semaphore) for query in unique], return_exceptions=True)
+        results = dict(zip(unique, results))
+        return [results[tuple(query)] for query in queries]
+
+    def call_many(self, queries):
+        """Scrape every (company_name, industry, region) query concurrently, running repeated queries once.
+
+        Results are returned in query order; a failed query returns its exception.
+        """
+        return asyncio.run(self.acall_many(queries))
@@ -0,0 +1,137 @@
+"""Offline end-to-end benchmark of the search pipeline against the local FakeApi server.
+
+Runs main()-equivalent jobs at several company counts and reports wall time, throughput,
+external call counts and the instrumentation report, without network access or spend:
+
+    python tests/benchmark.py --sizes 10 100 1000 --latency-scale 0.1 --error-rate 0.02
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_api import FakeApi
+
+# Typical latency in seconds of each provider, multiplied by --latency-scale
+PROVIDER_LATENCY = {
+    "openai": 1.0,
+    "perplexity": 3.0,
+    "apify": 20.0,
+    "linkedin": 0.5,
+    "crunchbase": 0.5,
+}
+
+
+def configure_environment(api, workdir):
+    """Point every client at the fake server; must run before the src modules are imported."""
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": api.openai_url,
+        "PPLX_API_KEY": "benchmark",
+        "PERPLEXITY_BASE_URL": api.perplexity_url,
+        "APIFY_API_TOKEN": "benchmark",
+        "APIFY_API_URL": api.apify_url,
+        "LINKEDIN_API_URL": api.linkedin_url,
+        "CRUNCHBASE_API_KEY": "benchmark",
+        "CRUNCHBASE_API_URL": api.crunchbase_url,
+        "CRUNCHBASE_INDEX_PATH": os.path.join(workdir, "crunchbase_permalinks.sqlite"),
+        "HORYZON_CACHE_PATH": os.path.join(workdir, "llm_responses.sqlite"),
+        "ENTITY_STORE_PATH": os.path.join(workdir, "entities.sqlite"),
+    })
+
+
+def run_staged(llm, Actions, query, industry, region, size, companies):
+    companies_info = llm.perform_action(Actions.SEARCH_COMPANIES, industry, region, size, limit=companies)
+    data_items = llm.perform_action(Actions.SEARCH_USER_DATA_ITEMS, query)
+    search_results = llm.perform_action(Actions.LAUNCH_SEARCH_APIS, companies_info)
+    source_plan = llm.perform_action(Actions.PLAN_DATA_SOURCES, data_items)
+    return llm.perform_action(Actions.EXTRACT_INFO, data_items, companies_info, search_results, source_plan=source_plan)
+
+
+def run_stream(llm, Actions, query, industry, region, size, companies):
+    return list(llm.perform_action(Actions.STREAM_PIPELINE, query, industry, region, size, limit=companies))
+
+
+def benchmark(api, workdir, mode, companies, rate_limits=False):
+    import crunchbase
+    import http_client
+    from llm import LLM
+    from constants import Actions
+    from instrumentation import metrics
+
+    api.companies = companies
+    api.calls.clear()
+    metrics.reset()
+    crunchbase.permalink_index = crunchbase.PermalinkIndex(os.path.join(workdir, f"permalinks-{mode}-{companies}.sqlite"))
+    http_client.clients.clear()
+    if not rate_limits:
+        for provider in ("linkedin", "crunchbase"):
+            http_client.clients[provider] = http_client.HttpClient(provider)
+    llm = LLM(cache=False, store=False)
+    run = run_staged if mode == "staged" else run_stream
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run(llm, Actions, "Funding, headquarters, size and founding date", "technology", "California", "medium-sized", companies)
+    wall_time = time.perf_counter() - started
+
+    report = metrics.report()
+    return {
+        "mode": mode,
+        "companies": companies,
+        "results": len(results),
+        "wall_time_s": round(wall_time, 3),
+        "companies_per_s": round(len(results) / wall_time, 3) if wall_time else None,
+        "external_calls": {provider: count for provider, count in sorted(api.calls.items()) if " " not in provider},
+        "external_calls_by_route": {route: count for route, count in sorted(api.calls.items()) if " " in route},
+        "stages_s": {name: round(span["total_s"], 3) for name, span in report["spans"].items() if name.startswith("stage.")},
+        "token_usage": report["token_usage"],
+        "counters": report["counters"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="company counts to benchmark")
+    parser.add_argument("--modes", nargs="+", default=["staged", "stream"], choices=["staged", "stream"])
+    parser.add_argument("--latency-scale", type=float, default=0.01, help="multiplier applied to PROVIDER_LATENCY")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the real per-provider rate limits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    api = FakeApi(
+        latency={provider: latency * args.latency_scale for provider, latency in PROVIDER_LATENCY.items()},
+        error_rate={provider: args.error_rate for provider in PROVIDER_LATENCY},
+        seed=args.seed
+    ).start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(api, workdir)
+        try:
+            results = []
+            for companies in args.sizes:
+                for mode in args.modes:
+                    results.append(benchmark(api, workdir, mode, companies, args.rate_limits))
+                    print(json.dumps({key: results[-1][key] for key in ("mode", "companies", "results", "wall_time_s", "companies_per_s")}), file=sys.stderr)
+        finally:
+            api.stop()
+
+    output = json.dumps(results, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The src modules import each other by their flat module names
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,226 @@
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+DATA_ITEMS = ["Funding", "Headquarters", "Number of employees", "Founded date"]
+
+
+def slugify(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+class FakeApi:
+    """Local stand-in for the OpenAI, Perplexity, Apify, LinkedIn and Crunchbase APIs.
+
+    Responses are synthetic but shaped like the real ones. Every provider can be given an
+    injected latency in seconds (with +/- jitter) and an error rate, the fraction of requests
+    answered with a 503. Requests are counted per provider and route.
+
+    Base URLs once started: openai_url, perplexity_url, apify_url, linkedin_url, crunchbase_url.
+    """
+
+    def __init__(self, companies=10, latency=None, error_rate=None, jitter=0.2, empty_rate=0.2, seed=0):
+        self.companies = companies
+        self.latency = latency or {}
+        self.error_rate = error_rate or {}
+        self.jitter = jitter
+        self.empty_rate = empty_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.runs = {}
+        self.server = None
+
+    def start(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                api.handle(self, "GET")
+
+            def do_POST(self):
+                api.handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    openai_url = property(lambda self: f"{self.url}/openai/v1")
+    perplexity_url = property(lambda self: f"{self.url}/perplexity")
+    apify_url = property(lambda self: f"{self.url}/apify")
+    linkedin_url = property(lambda self: f"{self.url}/linkedin/v2")
+    crunchbase_url = property(lambda self: f"{self.url}/crunchbase/api/v4")
+
+    def handle(self, request, method):
+        url = urlparse(request.path)
+        provider = url.path.strip("/").split("/")[0]
+        body = request.rfile.read(int(request.headers.get("Content-Length") or 0))
+        if request.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+
+        with self.lock:
+            route = f"{method} {re.sub(r'/(?=[^/]*[0-9])[^/]{6,}', '/:id', url.path)}"
+            self.calls[provider] = self.calls.get(provider, 0) + 1
+            self.calls[route] = self.calls.get(route, 0) + 1
+            fail = self.random.random() < self.error_rate.get(provider, 0)
+            delay = self.latency.get(provider, 0) * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+
+        time.sleep(delay)
+
+        if fail:
+            return self.respond(request, 503, {"error": "injected failure"})
+
+        try:
+            handler = getattr(self, f"handle_{provider}")
+            status, payload, headers = handler(method, url.path, parse_qs(url.query), json.loads(body) if body else None)
+        except Exception as e:
+            return self.respond(request, 500, {"error": repr(e)})
+
+        self.respond(request, status, payload, headers)
+
+    def respond(self, request, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            request.send_header(key, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    # Chat completions
+
+    def handle_openai(self, method, path, query, body):
+        return 200, self.completion(body, self.answer(body["messages"][-1]["content"])), {}
+
+    def handle_perplexity(self, method, path, query, body):
+        return self.handle_openai(method, path, query, body)
+
+    def completion(self, body, content):
+        prompt_tokens = sum(len(message["content"]) for message in body["messages"]) // 4
+        completion_tokens = len(content) // 4
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    def answer(self, prompt):
+        empty = self.random.random() < self.empty_rate
+
+        if "pieces of information" in prompt:
+            names = re.findall(r'"name": "(.*?)"', prompt.split("pieces of information")[1])
+            return json.dumps({name: "None" if empty else f"{name} value" for name in names})
+        if "Data items: " in prompt or "Companies: " in prompt:
+            names = json.loads(re.search(r"(?:Data items|Companies): (\[.*?\])", prompt).group(1))
+            return json.dumps({name: "None" if empty else "Synthetic answer" for name in names})
+        if "list of 15 companies" in prompt:
+            return json.dumps({"companies": [f"Company {idx}" for idx in range(self.companies)]})
+        if "For each data item provide" in prompt:
+            return json.dumps({"data_items": [
+                {"name": name, "description": f"The {name.lower()} of the company.", "format": "piece of text", "key_information": name.lower().split()}
+                for name in DATA_ITEMS
+            ]})
+        if "data_items" in prompt:
+            return json.dumps({"data_items": DATA_ITEMS})
+        if "Explain what we are looking for" in prompt:
+            return "Collect the requested information about the company."
+        if "would this piece of information" in prompt:
+            return "Piece of text"
+        if "key_information" in prompt:
+            return json.dumps({"data_item": "item", "key_information": ["value", "date"]})
+        if "kept_data_sources" in prompt:
+            return json.dumps({"kept_data_sources": ["linkedin_search_results", "crunchbase_search_results"]})
+        return "None" if empty else "Synthetic answer"
+
+    # Apify actor runs and datasets
+
+    def handle_apify(self, method, path, query, body):
+        parts = path.strip("/").split("/")
+
+        if method == "POST" and parts[-1] == "runs":
+            run_id = uuid.uuid4().hex
+            company_name = re.match(r"Company \d+", body["queries"]).group(0)
+            with self.lock:
+                self.runs[run_id] = company_name
+            return 201, {"data": self.run(run_id)}, {}
+
+        if parts[2] == "actor-runs":
+            return 200, {"data": self.run(parts[3])}, {}
+
+        if parts[2] == "datasets":
+            company_name = self.runs[parts[3]]
+            items = [{
+                "searchQuery": {"term": company_name},
+                "organicResults": [{"url": f"https://www.linkedin.com/company/{slugify(company_name)}/about?trk=x", "title": company_name}]
+            }]
+            offset = int(query.get("offset", ["0"])[0])
+            items = items[offset:]
+            headers = {
+                "x-apify-pagination-total": str(len(items)),
+                "x-apify-pagination-offset": str(offset),
+                "x-apify-pagination-limit": query.get("limit", ["999999999999"])[0],
+                "x-apify-pagination-desc": ""
+            }
+            return 200, items, headers
+
+        return 404, {"error": "unknown apify route"}, {}
+
+    @staticmethod
+    def run(run_id):
+        return {"id": run_id, "status": "SUCCEEDED", "defaultDatasetId": run_id, "defaultKeyValueStoreId": run_id}
+
+    # LinkedIn and Crunchbase
+
+    def handle_linkedin(self, method, path, query, body):
+        slug = path.rstrip("/").split("/")[-1]
+        return 200, {
+            "name": slug.replace("-", " ").title(),
+            "description": f"{slug} builds software. " * 20,
+            "headquarter": {"city": "San Francisco", "country": "US"},
+            "staffCount": 120,
+            "specialities": ["AI", "Software"],
+            "websiteUrl": f"https://{slug}.example.com"
+        }, {}
+
+    def handle_crunchbase(self, method, path, query, body):
+        if path.endswith("/autocompletes"):
+            slug = slugify(query.get("query", [""])[0].replace("+", " "))
+            return 200, {"entities": [{"identifier": {"permalink": f"{slug}-{idx}"}} for idx in range(3)]}, {}
+
+        # Only the last autocomplete candidate lists the company's LinkedIn page, like an ambiguous name would
+        permalink = path.rstrip("/").split("/")[-1]
+        slug, candidate = permalink.rsplit("-", 1)
+        linkedin_slug = slug if candidate == "2" else f"{slug}-{candidate}-other"
+        return 200, {"properties": {
+            "identifier": {"permalink": permalink, "value": slug},
+            "linkedin": {"value": f"https://www.linkedin.com/company/{linkedin_slug}"},
+            "short_description": f"{slug} builds software.",
+            "funding_total": {"value": 12000000, "currency": "USD"},
+            "founded_on": {"value": "2019-01-01"},
+            "num_employees_enum": "c_00101_00250"
+        }}, {}
@@ -1,4 +1,9 @@
-from src.linkedin import search_linkedin
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from linkedin import search_linkedin
 
 def manual_test():
     # Test data
@@ -0,0 +1,100 @@
+import asyncio
+import re
+import threading
+import time
+import uuid
+
+
+def linkedin_results(run_input):
+    """Default actor output: one Google result page pointing at the company's LinkedIn page."""
+    company_name = run_input["queries"].split(" site:")[0]
+    slug = re.sub(r"[^a-z0-9]+", "-", company_name.lower()).strip("-")
+    return [{
+        "searchQuery": {"term": run_input["queries"]},
+        "organicResults": [{"url": f"https://www.linkedin.com/company/{slug}/about", "title": company_name}]
+    }]
+
+
+class MockActorClient:
+    """In-process stand-in for ApifyClient, for offline Scraper tests.
+
+    Every actor run sleeps for latency seconds and stores results(run_input) as its dataset.
+    runs counts the actor runs started and items_read the dataset items returned.
+    """
+
+    def __init__(self, results=linkedin_results, latency=0):
+        self.results = results
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.datasets = {}
+        self.runs = 0
+        self.items_read = 0
+
+    def start_run(self, run_input):
+        run_id = uuid.uuid4().hex
+        with self.lock:
+            self.runs += 1
+            self.datasets[run_id] = self.results(run_input)
+        return {"id": run_id, "status": "SUCCEEDED", "defaultDatasetId": run_id}
+
+    def read_items(self, dataset_id, offset, limit):
+        items = self.datasets[dataset_id][offset:offset + limit if limit is not None else None]
+        with self.lock:
+            self.items_read += len(items)
+        return items
+
+    def actor(self, actor_id):
+        return MockActor(self)
+
+    def dataset(self, dataset_id):
+        return MockDataset(self, dataset_id)
+
+
+class MockActor:
+    def __init__(self, client):
+        self.client = client
+
+    def call(self, run_input=None, **kwargs):
+        time.sleep(self.client.latency)
+        return self.client.start_run(run_input)
+
+
+class MockDataset:
+    def __init__(self, client, dataset_id):
+        self.client = client
+        self.dataset_id = dataset_id
+
+    def iterate_items(self, offset=0, limit=None, **kwargs):
+        yield from self.client.read_items(self.dataset_id, offset, limit)
+
+
+class MockActorClientAsync(MockActorClient):
+    """In-process stand-in for ApifyClientAsync; in_flight_peak is the most runs awaited at once."""
+
+    def __init__(self, results=linkedin_results, latency=0):
+        super().__init__(results, latency)
+        self.in_flight = 0
+        self.in_flight_peak = 0
+
+    def actor(self, actor_id):
+        return MockActorAsync(self)
+
+    def dataset(self, dataset_id):
+        return MockDatasetAsync(self, dataset_id)
+
+
+class MockActorAsync(MockActor):
+    async def call(self, run_input=None, **kwargs):
+        self.client.in_flight += 1
+        self.client.in_flight_peak = max(self.client.in_flight_peak, self.client.in_flight)
+        try:
+            await asyncio.sleep(self.client.latency)
+            return self.client.start_run(run_input)
+        finally:
+            self.client.in_flight -= 1
+
+
+class MockDatasetAsync(MockDataset):
+    async def iterate_items(self, offset=0, limit=None, **kwargs):
+        for item in self.client.read_items(self.dataset_id, offset, limit):
+            yield item
@@ -0,0 +1,58 @@
+from columnar import ColumnarWriter, ColumnarReader
+
+
+def crash(writer):
+    """Leave the writer as an interrupted process would: column files flushed, index not updated."""
+    for file in writer.files.values():
+        file.flush()
+
+
+def test_rows_round_trip_with_sources(tmp_path):
+    with ColumnarWriter(tmp_path) as writer:
+        writer.write({"company": "A", "Funding": "$1M"}, {"linkedin": {"name": "A"}, "crunchbase": None})
+        writer.add_sources({"name": "B"}, {"linkedin": {"name": "B"}})
+        writer.write({"company": "B", "Funding": None, "Founded date": "2019"})
+
+    reader = ColumnarReader(tmp_path)
+    rows = list(reader.iter_rows(["company", "Funding", "Founded date"]))
+    assert len(reader) == 2
+    assert rows == [
+        {"company": "A", "Funding": "$1M", "Founded date": None},
+        {"company": "B", "Funding": None, "Founded date": "2019"},
+    ]
+    assert reader.load_columns(["company"]) == {"company": ["A", "B"]}
+    assert reader.sources(next(reader.iter_rows(["sources"]))) == {"linkedin": {"name": "A"}}
+
+
+def test_reopen_drops_rows_written_after_the_last_flush(tmp_path):
+    writer = ColumnarWriter(tmp_path, flush_every=2)
+    writer.write({"company": "A"})
+    writer.write({"company": "B"})
+    writer.write({"company": "C"})
+    crash(writer)
+
+    with ColumnarWriter(tmp_path) as writer:
+        writer.write({"company": "D"})
+
+    assert list(ColumnarReader(tmp_path).column("company")) == ["A", "B", "D"]
+
+
+def test_reopen_after_a_column_added_past_the_last_flush(tmp_path):
+    writer = ColumnarWriter(tmp_path, flush_every=2)
+    writer.write({"company": "A"})
+    writer.write({"company": "B"})
+    writer.write({"company": "C", "y": "y"})
+    crash(writer)
+
+    with ColumnarWriter(tmp_path) as writer:
+        writer.write({"company": "D", "y": "yy"})
+
+    reader = ColumnarReader(tmp_path)
+    assert len(reader) == 3
+    assert list(reader.iter_rows(["company", "y"])) == [
+        {"company": "A", "y": None},
+        {"company": "B", "y": None},
+        {"company": "D", "y": "yy"},
+    ]
+    with open(tmp_path / "columns" / reader.columns["y"]) as file:
+        assert file.read().splitlines() == ["null", "null", '"yy"']
@@ -0,0 +1,127 @@
+import threading
+import time
+from email.utils import formatdate
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+import http_client
+from http_client import HttpClient, TokenBucket
+
+
+@pytest.fixture
+def stub():
+    """Local HTTP server answering each request with the next scripted (status, headers) response."""
+    responses = []
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            requests.append(self.path)
+            status, headers = responses.pop(0) if responses else (200, {})
+            body = b'{"ok": true}' if status == 200 else b'{"error": "stub"}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    server.responses = responses
+    server.requests = requests
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the client's retry delays instead of waiting them out."""
+    delays = []
+    monkeypatch.setattr(http_client.time, "sleep", delays.append)
+    return delays
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_retries_a_retryable_status_then_succeeds(stub, sleeps, status):
+    stub.responses.extend([(status, {}), (200, {})])
+
+    response = HttpClient("stub", backoff=0.01).get(f"{stub.url}/companies/acme")
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert len(stub.requests) == 2
+    assert len(sleeps) == 1 and 0 < sleeps[0] <= 0.01
+
+
+def test_waits_for_a_numeric_retry_after(stub, sleeps):
+    stub.responses.extend([(429, {"Retry-After": "2"}), (200, {})])
+
+    assert HttpClient("stub").get(stub.url).status_code == 200
+    assert sleeps == [2.0]
+
+
+def test_waits_for_an_http_date_retry_after(stub, sleeps):
+    stub.responses.extend([(503, {"Retry-After": formatdate(time.time() + 10, usegmt=True)}), (200, {})])
+
+    assert HttpClient("stub").get(stub.url).status_code == 200
+    assert len(sleeps) == 1 and 8 <= sleeps[0] <= 10
+
+
+def test_retry_after_is_capped(stub, sleeps):
+    stub.responses.extend([(429, {"Retry-After": "3600"}), (200, {})])
+
+    HttpClient("stub").get(stub.url)
+
+    assert sleeps == [http_client.HTTP_MAX_BACKOFF]
+
+
+def test_gives_up_after_max_retries(stub, sleeps):
+    stub.responses.extend([(503, {})] * 5)
+
+    response = HttpClient("stub", max_retries=2, backoff=0.01).get(stub.url)
+
+    assert response.status_code == 503
+    assert len(stub.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_does_not_retry_other_errors(stub, sleeps):
+    stub.responses.append((404, {}))
+
+    assert HttpClient("stub").get(stub.url).status_code == 404
+    assert len(stub.requests) == 1
+    assert sleeps == []
+
+
+def test_token_bucket_paces_requests_after_the_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+
+    started = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    elapsed = time.monotonic() - started
+
+    # Two tokens are available at once, the other four arrive at 20 per second
+    assert 0.18 <= elapsed < 0.5
+
+
+def test_rate_limited_client_paces_its_requests(stub):
+    client = HttpClient("stub", rate_limit=(20, 1))
+
+    started = time.monotonic()
+    for _ in range(4):
+        assert client.get(stub.url).status_code == 200
+    elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.14
@@ -0,0 +1,75 @@
+from cache import ResponseCache
+from mock_actor import MockActorClient, MockActorClientAsync
+from scraper import Scraper
+
+
+def two_items(run_input):
+    return [{"organicResults": [{"url": "https://www.linkedin.com/company/acme"}]}, {"organicResults": []}]
+
+
+def test_repeated_query_reuses_the_cached_run():
+    client = MockActorClient(results=two_items)
+    scraper = Scraper(cache=ResponseCache(path=None), client=client)
+
+    first = scraper.call("Acme", "technology", "California")
+    second = scraper.call("Acme", "technology", "California")
+
+    assert first == second == two_items(None)[0]
+    assert client.runs == 1
+
+
+def test_only_the_first_dataset_item_is_read():
+    client = MockActorClient(results=two_items)
+    Scraper(client=client).call("Acme", "technology", "California")
+
+    assert client.items_read == 1
+
+
+def test_different_options_start_a_new_run():
+    client = MockActorClient()
+    scraper = Scraper(cache=ResponseCache(path=None), client=client)
+
+    scraper.call("Acme", "technology", "California")
+    scraper.call("Acme", "technology", "Texas")
+
+    assert client.runs == 2
+
+
+def test_call_many_runs_duplicates_once_within_the_concurrency_limit():
+    async_client = MockActorClientAsync(latency=0.01)
+    scraper = Scraper(client=MockActorClient(), async_client=async_client, max_concurrent_runs=3)
+    queries = [(f"Company {idx}", "technology", "California") for idx in range(10)]
+
+    results = scraper.call_many(queries + queries[:4])
+
+    assert async_client.runs == 10
+    assert async_client.items_read == 10
+    assert 1 < async_client.in_flight_peak <= 3
+    assert results[10:] == results[:4]
+    assert results[0]["organicResults"][0]["url"] == "https://www.linkedin.com/company/company-0-technology-in-california/about"
+
+
+def test_call_many_serves_cached_queries_without_a_run():
+    cache = ResponseCache(path=None)
+    client = MockActorClient()
+    async_client = MockActorClientAsync()
+    scraper = Scraper(cache=cache, client=client, async_client=async_client)
+
+    cached = scraper.call("Acme", "technology", "California")
+    results = scraper.call_many([("Acme", "technology", "California"), ("Beta", "technology", "California")])
+
+    assert results[0] == cached
+    assert async_client.runs == 1
+
+
+def test_call_many_returns_failures_in_place():
+    def fail_for_beta(run_input):
+        if run_input["queries"].startswith("Beta"):
+            raise RuntimeError("actor failed")
+        return two_items(run_input)
+
+    scraper = Scraper(client=MockActorClient(), async_client=MockActorClientAsync(results=fail_for_beta))
+    results = scraper.call_many([("Acme", "technology", "California"), ("Beta", "technology", "California")])
+
+    assert results[0] == two_items(None)[0]
+    assert isinstance(results[1], RuntimeError)